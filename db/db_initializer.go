@@ -44,7 +44,12 @@ func main() {
 		os.Remove(dbPath)
 	}
 	
-	db, err := sql.Open("sqlite3", dbPath)
+	// auto_vacuum has to be set before the first table is created. INCREMENTAL
+	// lets the downloader reclaim free pages with PRAGMA incremental_vacuum
+	// instead of rewriting the whole file with VACUUM. The pragma is per
+	// connection, so it goes in the DSN, which the driver applies to every
+	// connection the pool opens.
+	db, err := sql.Open("sqlite3", dbPath+"?_auto_vacuum=incremental")
 	if err != nil {
 		fmt.Printf("Error opening database: %v\n", err)
 		return
@@ -140,6 +145,8 @@ func main() {
 	CREATE INDEX idx_songs_url ON songs(url);
 	CREATE INDEX idx_songs_play_count ON songs(play_count);
 	CREATE INDEX idx_songs_last_played ON songs(last_played);
+	CREATE INDEX idx_songs_popularity ON songs(play_count, last_played);
+	CREATE INDEX idx_songs_path ON songs(file_path);
 	CREATE INDEX idx_playlists_url ON playlists(url);
 	CREATE INDEX idx_queues_guild_id ON queues(guild_id);
 	CREATE INDEX idx_queue_items_queue_id ON queue_items(queue_id);
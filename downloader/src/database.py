@@ -1,32 +1,255 @@
 import sqlite3
 import os
 import time
+import queue
+import random
+import atexit
 import threading
+import urllib.parse
+from collections import Counter
+from contextlib import contextmanager
+from cache import TTLCache
+
+# Statements are kept as module-level constants so every call hands sqlite3
+# the same string and hits the connection's statement cache instead of
+# re-parsing the SQL.
+SONG_COLUMNS = "id, title, url, platform, file_path, duration, file_size, thumbnail_url, artist, is_stream"
+
+SQL_GET_SONG_BY_URL = f"SELECT {SONG_COLUMNS} FROM songs WHERE url = ?"
+SQL_GET_SONG_BY_PATH = f"SELECT {SONG_COLUMNS} FROM songs WHERE file_path = ?"
+SQL_GET_PLAYLIST_BY_URL = "SELECT id, title, url, platform FROM playlists WHERE url = ?"
+SQL_GET_SONG_ID_BY_URL = "SELECT id FROM songs WHERE url = ?"
+SQL_GET_PLAYLIST_ID_BY_URL = "SELECT id FROM playlists WHERE url = ?"
+SQL_INSERT_SONG = """
+    INSERT INTO songs (
+        title, url, platform, file_path, duration, file_size, 
+        thumbnail_url, artist, download_date, is_stream
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(url) DO UPDATE SET url = url
+    RETURNING id
+"""
+SQL_UPSERT_SONG = """
+    INSERT INTO songs (
+        title, url, platform, file_path, duration, file_size, 
+        thumbnail_url, artist, download_date, is_stream
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(url) DO UPDATE SET
+        title = excluded.title,
+        platform = excluded.platform,
+        file_path = excluded.file_path,
+        duration = excluded.duration,
+        file_size = excluded.file_size,
+        thumbnail_url = excluded.thumbnail_url,
+        artist = excluded.artist,
+        is_stream = excluded.is_stream
+    RETURNING id
+"""
+SQL_INSERT_PLAYLIST = """
+    INSERT INTO playlists (title, url, platform, download_date) VALUES (?, ?, ?, ?)
+    ON CONFLICT(url) DO UPDATE SET url = url
+    RETURNING id
+"""
+SQL_UPSERT_PLAYLIST_SONG = """
+    INSERT INTO playlist_songs (playlist_id, song_id, position) VALUES (?, ?, ?)
+    ON CONFLICT(playlist_id, song_id) DO UPDATE SET position = excluded.position
+"""
+SQL_ADD_PLAY_COUNT = "UPDATE songs SET play_count = play_count + ?, last_played = ? WHERE id = ?"
+SQL_COUNT_SONGS = "SELECT COUNT(*) FROM songs"
+SQL_SONG_COUNT_AT_LEAST = "SELECT EXISTS(SELECT 1 FROM songs LIMIT 1 OFFSET ?)"
+SQL_GET_LEAST_POPULAR_SONGS = f"""
+    SELECT {SONG_COLUMNS}, play_count, last_played FROM songs
+    ORDER BY play_count ASC, last_played ASC
+    LIMIT ?
+"""
+SQL_DELETE_SONG_FROM_PLAYLISTS = "DELETE FROM playlist_songs WHERE song_id = ?"
+SQL_DELETE_SONG = "DELETE FROM songs WHERE id = ?"
+
+# Maintenance: planner statistics are refreshed after every this many
+# deletes, and free pages are handed back to the filesystem in steps of
+# MAINTENANCE_VACUUM_PAGES (a no-op unless the database was created with
+# auto_vacuum=INCREMENTAL, which the Go initializer sets for new databases)
+MAINTENANCE_DELETE_INTERVAL = 100
+MAINTENANCE_VACUUM_PAGES = 1000
+SQL_MAINTENANCE = (
+    "ANALYZE songs;"
+    "ANALYZE playlist_songs;"
+    f"PRAGMA incremental_vacuum({MAINTENANCE_VACUUM_PAGES});"
+)
+
+# Songs found by url are kept this many seconds, at most this many of them.
+# Writes from this process drop their entries. The bot and the janitor change
+# the same database from other processes, so the TTL is kept short; callers
+# still check the song's file on disk. Misses are never cached.
+SONG_CACHE_SIZE = 512
+SONG_CACHE_TTL = 5.0
+
+# get_song_count results are reused for this many seconds. Writes from this
+# process invalidate the count straight away.
+SONG_COUNT_TTL = 5.0
+
+# Buffered play counts are written out once this many songs are pending, and
+# at the latest this many seconds after the first play of a batch
+PLAY_FLUSH_MAX_SONGS = 32
+PLAY_FLUSH_INTERVAL = 5.0
+
+# Indexes for the eviction scan and the file_path lookup. url and
+# (playlist_id, song_id) are already covered by their UNIQUE/PRIMARY KEY
+# constraints.
+SQL_ENSURE_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_songs_popularity ON songs(play_count, last_played)",
+    "CREATE INDEX IF NOT EXISTS idx_songs_path ON songs(file_path)",
+)
+
+def _apply_pragmas(conn, db_path, readonly=False):
+    # Runs once per connection, right after it is opened. busy_timeout lets
+    # SQLite itself handle lock retries instead of the Python wrapper.
+    # mmap_size lets page reads come straight out of the OS page cache
+    # instead of going through a read() syscall per page.
+    pragmas = (
+        "PRAGMA synchronous=NORMAL;"
+        "PRAGMA temp_store=MEMORY;"
+        "PRAGMA cache_size=-64000;"
+        "PRAGMA busy_timeout=5000;"
+        "PRAGMA mmap_size=268435456;"
+    )
+    # WAL needs a real file on disk, and is persisted in the file by the
+    # writer so read-only connections don't have to (and can't) set it
+    if db_path != ":memory:" and not readonly:
+        pragmas = "PRAGMA journal_mode=WAL;" + pragmas
+    conn.executescript(pragmas)
+
+# Retry policy for Database._run: capped exponential backoff with jitter so
+# threads that hit the same lock don't all wake up at the same moment
+RETRY_MAX_ATTEMPTS = 3
+RETRY_BASE_DELAY = 0.05
+RETRY_MAX_DELAY = 2.0
+RETRY_JITTER = 0.5
+
+def _retry_delay(attempt):
+    delay = min(RETRY_BASE_DELAY * 2 ** attempt, RETRY_MAX_DELAY)
+    return delay * (1 + random.random() * RETRY_JITTER)
+
+def _is_busy_error(error):
+    # SQLITE_BUSY/SQLITE_LOCKED leave the connection perfectly usable
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
+
+class ConnectionPool:
+    # One writer connection plus size - 1 read-only connections. Writes are
+    # serialized anyway, so the readers never compete with it for a slot.
+    # An in-memory database is private to its connection, so it gets the
+    # writer only and reads are routed to it as well.
+    def __init__(self, db_path, size=4):
+        self.db_path = db_path
+        self.size = size
+        reader_count = 0 if db_path == ":memory:" else max(size - 1, 0)
+        self._writers = queue.Queue(maxsize=1)
+        self._readers = queue.Queue(maxsize=reader_count) if reader_count else None
+        
+        # Don't create an empty database file if it isn't there yet, the
+        # slots are filled lazily on first use instead. The writer goes
+        # first so the database is already in WAL mode when readers open it.
+        prefill = os.path.exists(db_path)
+        self._writers.put(self._connect() if prefill else None)
+        for _ in range(reader_count):
+            self._readers.put(self._connect(readonly=True) if prefill else None)
+    
+    def _connect(self, readonly=False):
+        try:
+            if readonly:
+                # mode=ro never takes the write lock. cache=shared is left
+                # out on purpose: it switches to table-level locking, which
+                # would make readers block on the writer again under WAL.
+                conn = sqlite3.connect(
+                    f"file:{urllib.parse.quote(self.db_path)}?mode=ro",
+                    uri=True,
+                    isolation_level=None,
+                    check_same_thread=False,
+                    cached_statements=256
+                )
+            else:
+                conn = sqlite3.connect(
+                    self.db_path,
+                    isolation_level=None,
+                    check_same_thread=False,
+                    cached_statements=256
+                )
+            conn.row_factory = sqlite3.Row
+            _apply_pragmas(conn, self.db_path, readonly)
+            return conn
+        except sqlite3.Error as e:
+            print(f"Database connection error: {e}")
+            raise
+    
+    @contextmanager
+    def acquire(self, readonly=False):
+        readonly = readonly and self._readers is not None
+        slots = self._readers if readonly else self._writers
+        conn = slots.get()
+        try:
+            if conn is None:
+                conn = self._connect(readonly)
+            yield conn
+        except sqlite3.OperationalError as e:
+            if _is_busy_error(e):
+                raise
+            # Anything else may have left the connection unusable, drop it
+            # and let the slot reconnect on next checkout
+            if conn is not None:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            conn = None
+            raise
+        finally:
+            slots.put(conn)
+    
+    def close(self):
+        for slots in (self._writers, self._readers):
+            if slots is None:
+                continue
+            for _ in range(slots.maxsize):
+                conn = slots.get()
+                if conn is not None:
+                    conn.close()
+                slots.put(None)
 
 class Database:
-    def __init__(self, db_path):
+    def __init__(self, db_path, pool_size=4):
         self.db_path = db_path
-        self.local = threading.local()
         
         # Check if database exists
         if not os.path.exists(db_path):
             print(f"Warning: Database file does not exist at: {db_path}")
             print("Will continue, but some functionality will be limited")
         
-    def get_connection(self):
-        if not hasattr(self.local, 'conn') or self.local.conn is None:
-            try:
-                self.local.conn = sqlite3.connect(self.db_path, timeout=10.0)
-                self.local.conn.row_factory = sqlite3.Row
-            except sqlite3.Error as e:
-                print(f"Database connection error: {e}")
-                raise
-        return self.local.conn
+        self.pool = ConnectionPool(db_path, pool_size)
+        self._write_lock = threading.Lock()
+        
+        self._play_lock = threading.Lock()
+        self._play_buffer = Counter()
+        self._play_last_played = {}
+        self._play_timer = None
+        atexit.register(self.flush_play_counts)
+        
+        self._delete_lock = threading.Lock()
+        self._delete_count = 0
+        
+        self._songs_by_url = TTLCache(maxsize=SONG_CACHE_SIZE, ttl=SONG_CACHE_TTL)
+        # Bumped by every song write. A lookup only caches its row if no
+        # write happened while it was querying.
+        self._song_cache_lock = threading.Lock()
+        self._song_writes = 0
+        # (expiry, count), replaced as a whole so readers need no lock
+        self._song_count = None
         
     def close(self):
-        if hasattr(self.local, 'conn') and self.local.conn:
-            self.local.conn.close()
-            self.local.conn = None
+        self.flush_play_counts()
+        timer = self._play_timer
+        if timer is not None:
+            timer.cancel()
+        self.pool.close()
             
     def __enter__(self):
         return self
@@ -34,74 +257,137 @@ class Database:
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.close()
     
-    def execute(self, query, params=None):
-        attempts = 0
-        max_attempts = 3
+    def _run(self, kind, operation, lock=None, readonly=False):
         last_error = None
         
-        while attempts < max_attempts:
+        for attempt in range(RETRY_MAX_ATTEMPTS):
             try:
-                conn = self.get_connection()
-                cursor = conn.cursor()
-                if params:
-                    cursor.execute(query, params)
-                else:
-                    cursor.execute(query)
-                conn.commit()
-                return cursor
+                if lock is None:
+                    with self.pool.acquire(readonly) as conn:
+                        return operation(conn)
+                with lock, self.pool.acquire(readonly) as conn:
+                    return operation(conn)
             except sqlite3.Error as e:
                 last_error = e
-                attempts += 1
-                print(f"Database execute error (attempt {attempts}/{max_attempts}): {e}")
-                
-                # Close and reopen connection
-                self.close()
+                print(f"Database {kind} error (attempt {attempt + 1}/{RETRY_MAX_ATTEMPTS}): {e}")
                 
-                # Wait before retrying
-                time.sleep(0.5)
+                # Busy connections stay in the pool, only broken ones were
+                # replaced by acquire()
+                if attempt + 1 < RETRY_MAX_ATTEMPTS:
+                    time.sleep(_retry_delay(attempt))
         
-        print(f"Failed all {max_attempts} database execute attempts")
+        print(f"Failed all {RETRY_MAX_ATTEMPTS} database {kind} attempts")
         raise last_error
     
-    def query(self, query, params=None):
-        attempts = 0
-        max_attempts = 3
-        last_error = None
-        
-        while attempts < max_attempts:
+    def _execute_write(self, kind, operation):
+        # SQLite only allows one writer at a time. Writers from this process
+        # queue up on a plain mutex instead of all racing for the database
+        # lock and falling into the busy/retry path.
+        def in_transaction(conn):
+            conn.execute("BEGIN IMMEDIATE")
             try:
-                conn = self.get_connection()
-                cursor = conn.cursor()
-                if params:
-                    cursor.execute(query, params)
-                else:
-                    cursor.execute(query)
-                return cursor.fetchall()
-            except sqlite3.Error as e:
-                last_error = e
-                attempts += 1
-                print(f"Database query error (attempt {attempts}/{max_attempts}): {e}")
-                
-                # Close and reopen connection
-                self.close()
-                
-                # Wait before retrying
-                time.sleep(0.5)
-        
-        print(f"Failed all {max_attempts} database query attempts")
-        raise last_error
+                result = operation(conn)
+                conn.execute("COMMIT")
+            except BaseException:
+                # Whatever went wrong, the writer connection must not go
+                # back to the pool holding the write lock
+                if conn.in_transaction:
+                    try:
+                        conn.execute("ROLLBACK")
+                    except sqlite3.Error:
+                        pass
+                raise
+
+            # Only re-analyzes tables whose statistics have gone stale, so
+            # this is close to free on most commits. The write is already
+            # committed, so a failure here must not trigger a retry.
+            try:
+                conn.execute("PRAGMA optimize")
+            except sqlite3.Error:
+                pass
+            return result
+
+        return self._run(kind, in_transaction, lock=self._write_lock)
+    
+    def _execute_read(self, kind, operation):
+        return self._run(kind, operation, readonly=True)
+    
+    def execute(self, query, params=None):
+        return self._execute_write("execute", lambda conn: conn.execute(query, params or ()))
+    
+    def execute_returning(self, query, params=None):
+        # Rows from a RETURNING clause have to be drained before the
+        # transaction commits
+        rows = self._execute_write("execute", lambda conn: conn.execute(query, params or ()).fetchall())
+        return rows[0] if rows else None
+    
+    def executemany(self, query, rows):
+        rows = list(rows)
+        return self._execute_write("executemany", lambda conn: conn.executemany(query, rows))
+    
+    def query(self, query, params=None):
+        return self._execute_read("query", lambda conn: conn.execute(query, params or ()).fetchall())
+    
+    def ensure_indexes(self):
+        # Databases created by older initializers don't have these yet
+        try:
+            for statement in SQL_ENSURE_INDEXES:
+                self.execute(statement)
+        except Exception as e:
+            print(f"Error in ensure_indexes: {e}")
+    
+    def _scalar(self, query, params=None):
+        # First column of the first row, for lookups that only need one value
+        result = self.query(query, params)
+        return result[0][0] if result else None
+    
+    def get_song_id_by_url(self, url):
+        try:
+            return self._scalar(SQL_GET_SONG_ID_BY_URL, (url,))
+        except Exception as e:
+            print(f"Error in get_song_id_by_url: {e}")
+            return None
+    
+    def get_playlist_id_by_url(self, url):
+        try:
+            return self._scalar(SQL_GET_PLAYLIST_ID_BY_URL, (url,))
+        except Exception as e:
+            print(f"Error in get_playlist_id_by_url: {e}")
+            return None
     
     def get_song_by_url(self, url):
+        song = self._songs_by_url.get(url)
+        if song is not None:
+            return song
+        
+        writes = self._song_writes
         try:
-            result = self.query("SELECT * FROM songs WHERE url = ?", (url,))
-            return result[0] if result else None
+            result = self.query(SQL_GET_SONG_BY_URL, (url,))
         except Exception as e:
             print(f"Error in get_song_by_url: {e}")
             return None
+        
+        song = result[0] if result else None
+        if song is not None:
+            with self._song_cache_lock:
+                if writes == self._song_writes:
+                    self._songs_by_url.put(url, song)
+        return song
+    
+    def _forget_songs(self, url=None):
+        # After a song write: drops the url's cached row, or every row when
+        # the url isn't known, and the cached count
+        with self._song_cache_lock:
+            self._song_writes += 1
+            if url is None:
+                self._songs_by_url.clear()
+            else:
+                self._songs_by_url.discard(url)
+        self._song_count = None
     
     def get_song_by_path(self, file_path):
         try:
-            result = self.query("SELECT * FROM songs WHERE file_path = ?", (file_path,))
+            result = self.query(SQL_GET_SONG_BY_PATH, (file_path,))
             return result[0] if result else None
         except Exception as e:
             print(f"Error in get_song_by_path: {e}")
@@ -109,7 +395,7 @@ class Database:
     
     def get_playlist_by_url(self, url):
         try:
-            result = self.query("SELECT * FROM playlists WHERE url = ?", (url,))
+            result = self.query(SQL_GET_PLAYLIST_BY_URL, (url,))
             return result[0] if result else None
         except Exception as e:
             print(f"Error in get_playlist_by_url: {e}")
@@ -118,114 +404,173 @@ class Database:
     def add_song(self, title, url, platform, file_path, duration=None, file_size=None, 
                 thumbnail_url=None, artist=None, is_stream=False):
         try:
-            # First check if the song already exists
-            existing = self.get_song_by_url(url)
-            if existing:
-                return existing['id']
-            
+            # The no-op upsert returns the existing id when the url is
+            # already stored, so no separate lookup is needed
             current_time = int(time.time())
-            self.execute(
-                """
-                INSERT INTO songs (
-                    title, url, platform, file_path, duration, file_size, 
-                    thumbnail_url, artist, download_date, is_stream
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
+            row = self.execute_returning(
+                SQL_INSERT_SONG,
                 (title, url, platform, file_path, duration, file_size, 
                  thumbnail_url, artist, current_time, is_stream)
             )
-            
-            # Get the ID of the inserted row
-            result = self.query("SELECT last_insert_rowid()")
-            return result[0][0] if result else None
+            self._forget_songs(url)
+            return row[0] if row else None
             
         except Exception as e:
             print(f"Error in add_song: {e}")
             raise
     
-    def add_playlist(self, title, url, platform):
+    def upsert_song(self, title, url, platform, file_path, duration=None, file_size=None, 
+                    thumbnail_url=None, artist=None, is_stream=False):
         try:
-            # First check if the playlist already exists
-            existing = self.get_playlist_by_url(url)
-            if existing:
-                return existing['id']
+            # Like add_song, but an existing row for the url is refreshed with
+            # the new file and metadata. Play statistics and download_date are
+            # left as they are.
+            current_time = int(time.time())
+            row = self.execute_returning(
+                SQL_UPSERT_SONG,
+                (title, url, platform, file_path, duration, file_size, 
+                 thumbnail_url, artist, current_time, is_stream)
+            )
+            self._forget_songs(url)
+            return row[0] if row else None
             
+        except Exception as e:
+            print(f"Error in upsert_song: {e}")
+            raise
+    
+    def add_playlist(self, title, url, platform):
+        try:
             current_time = int(time.time())
-            self.execute(
-                "INSERT INTO playlists (title, url, platform, download_date) VALUES (?, ?, ?, ?)",
+            row = self.execute_returning(
+                SQL_INSERT_PLAYLIST,
                 (title, url, platform, current_time)
             )
-            
-            # Get the ID of the inserted row
-            result = self.query("SELECT last_insert_rowid()")
-            return result[0][0] if result else None
+            return row[0] if row else None
             
         except Exception as e:
             print(f"Error in add_playlist: {e}")
             raise
     
     def add_song_to_playlist(self, playlist_id, song_id, position):
+        self.add_songs_to_playlist(playlist_id, [(song_id, position)])
+    
+    def add_songs_to_playlist(self, playlist_id, song_positions):
         try:
-            # Check if the song is already in the playlist
-            result = self.query(
-                "SELECT position FROM playlist_songs WHERE playlist_id = ? AND song_id = ?",
-                (playlist_id, song_id)
+            self.executemany(
+                SQL_UPSERT_PLAYLIST_SONG,
+                ((playlist_id, song_id, position) for song_id, position in song_positions)
             )
-            
-            if result:
-                # Song already in playlist, update position if needed
-                if result[0][0] != position:
-                    self.execute(
-                        "UPDATE playlist_songs SET position = ? WHERE playlist_id = ? AND song_id = ?",
-                        (position, playlist_id, song_id)
-                    )
-                return
-            
-            # Song not in playlist, add it
-            self.execute(
-                "INSERT INTO playlist_songs (playlist_id, song_id, position) VALUES (?, ?, ?)",
-                (playlist_id, song_id, position)
-            )
-            
         except Exception as e:
-            print(f"Error in add_song_to_playlist: {e}")
+            print(f"Error in add_songs_to_playlist: {e}")
             raise
     
     def increment_play_count(self, song_id):
+        # Plays are counted in memory and written in batches, so a busy
+        # player doesn't cost one commit per play. The first play of a batch
+        # starts a timer, so a batch never waits on a later play to be written.
+        with self._play_lock:
+            self._play_buffer[song_id] += 1
+            self._play_last_played[song_id] = int(time.time())
+            flush_due = len(self._play_buffer) >= PLAY_FLUSH_MAX_SONGS
+            
+            if not flush_due and self._play_timer is None:
+                self._play_timer = threading.Timer(PLAY_FLUSH_INTERVAL, self.flush_play_counts)
+                self._play_timer.daemon = True
+                self._play_timer.start()
+        
+        if flush_due:
+            self.flush_play_counts()
+    
+    def flush_play_counts(self):
+        with self._play_lock:
+            batch = [(count, self._play_last_played[song_id], song_id)
+                     for song_id, count in self._play_buffer.items()]
+            self._play_buffer.clear()
+            self._play_last_played.clear()
+            timer, self._play_timer = self._play_timer, None
+        
+        # A no-op when the timer itself is flushing
+        if timer is not None:
+            timer.cancel()
+        
+        if not batch:
+            return
+        
         try:
-            current_time = int(time.time())
-            self.execute(
-                "UPDATE songs SET play_count = play_count + 1, last_played = ? WHERE id = ?",
-                (current_time, song_id)
-            )
+            self.executemany(SQL_ADD_PLAY_COUNT, batch)
         except Exception as e:
-            print(f"Error in increment_play_count: {e}")
+            print(f"Error in flush_play_counts: {e}")
+    
+    def _cached_song_count(self):
+        cached = self._song_count
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+        return None
     
     def get_song_count(self):
+        count = self._cached_song_count()
+        if count is not None:
+            return count
+        
         try:
-            result = self.query("SELECT COUNT(*) FROM songs")
-            return result[0][0] if result else 0
+            count = self._scalar(SQL_COUNT_SONGS) or 0
         except Exception as e:
             print(f"Error in get_song_count: {e}")
             return 0
+        
+        self._song_count = (time.monotonic() + SONG_COUNT_TTL, count)
+        return count
+    
+    def song_count_at_least(self, count):
+        known = self._cached_song_count()
+        if known is not None:
+            return known >= count
+        
+        # Stops after count rows instead of counting the whole table
+        try:
+            return bool(self._scalar(SQL_SONG_COUNT_AT_LEAST, (max(count - 1, 0),)))
+        except Exception as e:
+            print(f"Error in song_count_at_least: {e}")
+            return False
     
     def get_least_popular_songs(self, limit):
         try:
-            return self.query(
-                """
-                SELECT * FROM songs
-                ORDER BY play_count ASC, last_played ASC
-                LIMIT ?
-                """,
-                (limit,)
-            )
+            return self.query(SQL_GET_LEAST_POPULAR_SONGS, (limit,))
         except Exception as e:
             print(f"Error in get_least_popular_songs: {e}")
             return []
     
     def delete_song(self, song_id):
         try:
-            self.execute("DELETE FROM playlist_songs WHERE song_id = ?", (song_id,))
-            self.execute("DELETE FROM songs WHERE id = ?", (song_id,))
+            def delete(conn):
+                conn.execute(SQL_DELETE_SONG_FROM_PLAYLISTS, (song_id,))
+                conn.execute(SQL_DELETE_SONG, (song_id,))
+            
+            self._execute_write("delete_song", delete)
+        except Exception as e:
+            print(f"Error in delete_song: {e}")
+            return
+        finally:
+            # Only the id is known here, drop every cached song
+            self._forget_songs()
+        
+        with self._delete_lock:
+            self._delete_count += 1
+            maintenance_due = self._delete_count % MAINTENANCE_DELETE_INTERVAL == 0
+        
+        if maintenance_due:
+            threading.Thread(target=self.run_maintenance, daemon=True).start()
+    
+    def run_maintenance(self):
+        # ANALYZE and incremental_vacuum write to the database, so they
+        # queue behind the write lock like any other writer. VACUUM is never
+        # run here since it rewrites the whole file.
+        # executescript steps every statement to completion, a plain
+        # execute() would only free one page of the incremental_vacuum
+        def maintain(conn):
+            conn.executescript(SQL_MAINTENANCE)
+        
+        try:
+            self._run("maintenance", maintain, lock=self._write_lock)
         except Exception as e:
-            print(f"Error in delete_song: {e}")
\ No newline at end of file
+            print(f"Error in run_maintenance: {e}")
\ No newline at end of file
@@ -1,66 +1,172 @@
 import sys
 import time
+import queue
+import threading
+import atexit
+import logging
+import logging.handlers
 
-class ColoredLogger:
-    RESET = "\033[0m"
-    BOLD = "\033[1m"
-    RED = "\033[31m"
-    GREEN = "\033[32m"
-    YELLOW = "\033[33m"
-    BLUE = "\033[34m"
-    CYAN = "\033[36m"
-    PURPLE = "\033[35m"
-    GRAY = "\033[90m"
-
-    ERROR = 0
-    WARNING = 1
-    INFO = 2
-    DEBUG = 3
-
-    def __init__(self, level=INFO, use_colors=True):
-        self.level = level
+RESET = "\033[0m"
+BOLD = "\033[1m"
+RED = "\033[31m"
+GREEN = "\033[32m"
+YELLOW = "\033[33m"
+BLUE = "\033[34m"
+CYAN = "\033[36m"
+PURPLE = "\033[35m"
+GRAY = "\033[90m"
+
+ERROR = logging.ERROR
+WARNING = logging.WARNING
+INFO = logging.INFO
+DEBUG = logging.DEBUG
+
+class ColoredFormatter(logging.Formatter):
+    def __init__(self, use_colors=True):
+        super().__init__(datefmt="%Y-%m-%d %H:%M:%S")
+        self.set_colors(use_colors)
+        # (second, formatted timestamp), replaced as one tuple
+        self._ts_cache = (None, "")
+
+    def set_colors(self, use_colors):
+        # Prefixes are built once here instead of on every log call
         self.use_colors = use_colors
-        
-    def format_timestamp(self):
-        timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
-        return timestamp
-        
-    def error(self, message):
-        if self.level >= self.ERROR:
-            prefix = "ERROR: "
-            if self.use_colors:
-                prefix = f"{self.RED}{self.BOLD}{prefix}{self.RESET}"
-            timestamp = self.format_timestamp()
-            print(f"{prefix}{timestamp} {message}", file=sys.stderr)
-            
-    def warning(self, message):
-        if self.level >= self.WARNING:
-            prefix = "WARNING: "
-            if self.use_colors:
-                prefix = f"{self.YELLOW}{self.BOLD}{prefix}{self.RESET}"
-            timestamp = self.format_timestamp()
-            print(f"{prefix}{timestamp} {message}", file=sys.stderr)
-            
-    def info(self, message):
-        if self.level >= self.INFO:
-            prefix = "INFO: "
-            if self.use_colors:
-                prefix = f"{self.GREEN}{prefix}{self.RESET}"
-            timestamp = self.format_timestamp()
-            print(f"{prefix}{timestamp} {message}")
-            
-    def debug(self, message):
-        if self.level >= self.DEBUG:
-            prefix = "DEBUG: "
-            if self.use_colors:
-                prefix = f"{self.CYAN}{prefix}{self.RESET}"
-            timestamp = self.format_timestamp()
-            print(f"{prefix}{timestamp} {message}")
-
-logger = ColoredLogger(level=ColoredLogger.INFO)
+        if use_colors:
+            self._prefixes = {
+                ERROR: f"{RED}{BOLD}ERROR: {RESET}",
+                WARNING: f"{YELLOW}{BOLD}WARNING: {RESET}",
+                INFO: f"{GREEN}INFO: {RESET}",
+                DEBUG: f"{CYAN}DEBUG: {RESET}",
+            }
+        else:
+            self._prefixes = {
+                ERROR: "ERROR: ",
+                WARNING: "WARNING: ",
+                INFO: "INFO: ",
+                DEBUG: "DEBUG: ",
+            }
+
+    def formatTime(self, record, datefmt=None):
+        # The timestamp only has second resolution, so it is formatted again
+        # only when the second changes instead of on every record
+        second = int(record.created)
+        cached = self._ts_cache
+        if cached[0] != second:
+            cached = (second, time.strftime(datefmt or self.datefmt, self.converter(second)))
+            self._ts_cache = cached
+        return cached[1]
+
+    def format(self, record):
+        prefix = self._prefixes.get(record.levelno) or record.levelname + ": "
+        return f"{prefix}{self.formatTime(record, self.datefmt)} {record.getMessage()}"
+
+class _MaxLevelFilter(logging.Filter):
+    def __init__(self, max_level):
+        super().__init__()
+        self.max_level = max_level
+
+    def filter(self, record):
+        return record.levelno <= self.max_level
+
+class BufferedStreamHandler(logging.StreamHandler):
+    """StreamHandler that collects formatted records and writes them out in
+    one go every flush_interval seconds instead of once per record"""
+
+    def __init__(self, stream=None, flush_interval=0.05):
+        super().__init__(stream)
+        self.flush_interval = flush_interval
+        self._buffer = []
+        # First record of the pending batch, reported if writing it fails
+        self._batch_record = None
+        self._buffer_lock = threading.Lock()
+        # Set when the buffer goes from empty to non-empty, so an idle
+        # flusher sleeps until there is something to write
+        self._pending = threading.Event()
+        self._stop_flushing = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name="log-flush", daemon=True)
+        self._flusher.start()
+
+    def emit(self, record):
+        try:
+            msg = self.format(record)
+            with self._buffer_lock:
+                if not self._buffer:
+                    self._batch_record = record
+                    self._pending.set()
+                self._buffer.append(msg)
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        with self._buffer_lock:
+            self._pending.clear()
+            if not self._buffer:
+                return
+            pending = self._buffer
+            record = self._batch_record
+            self._buffer = []
+            self._batch_record = None
+        # Written through the stream rather than its fd so log lines stay
+        # ordered with anything else printed to the same stream
+        self.acquire()
+        try:
+            self.stream.write(self.terminator.join(pending) + self.terminator)
+            self.stream.flush()
+        except Exception:
+            self.handleError(record)
+        finally:
+            self.release()
+
+    def close(self):
+        self._stop_flushing.set()
+        self._pending.set()
+        self.flush()
+        super().close()
+
+    def _flush_loop(self):
+        while not self._stop_flushing.is_set():
+            self._pending.wait()
+            # Give the batch flush_interval to fill up; close() cuts it short
+            self._stop_flushing.wait(self.flush_interval)
+            self.flush()
+
+_formatter = ColoredFormatter()
+
+# Errors and warnings go to stderr, everything below to stdout, same as the
+# old print based logger
+_stdout_handler = BufferedStreamHandler(sys.stdout)
+_stdout_handler.addFilter(_MaxLevelFilter(INFO))
+_stdout_handler.setFormatter(_formatter)
+
+_stderr_handler = BufferedStreamHandler(sys.stderr)
+_stderr_handler.setLevel(WARNING)
+_stderr_handler.setFormatter(_formatter)
+
+# Callers only enqueue the record; the stream writes happen on the listener
+# thread so a log call never waits on stdout/stderr
+_queue = queue.SimpleQueue()
+_listener = logging.handlers.QueueListener(_queue, _stdout_handler, _stderr_handler, respect_handler_level=True)
+_listener.start()
+
+def _shutdown():
+    # Drain the queue first, then write out whatever is still buffered
+    _listener.stop()
+    _stdout_handler.close()
+    _stderr_handler.close()
+
+atexit.register(_shutdown)
+
+logger = logging.getLogger("downloader")
+logger.addHandler(logging.handlers.QueueHandler(_queue))
+logger.setLevel(INFO)
+logger.propagate = False
+
+# Level check under the print based logger's name, lets callers skip building
+# expensive messages
+logger.is_enabled = logger.isEnabledFor
 
 def set_level(level):
-    logger.level = level
-    
+    logger.setLevel(level)
+
 def set_colors(use_colors):
-    logger.use_colors = use_colors
\ No newline at end of file
+    _formatter.set_colors(use_colors)
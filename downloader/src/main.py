@@ -1,11 +1,31 @@
-import json
 import os
 import signal
-import time
+import threading
 import ytdlp_handler
 import uds_handler
 import logger
 
+try:
+    import orjson as _json
+except ImportError:
+    import json as _json
+
+# path -> (st_mtime_ns, parsed dict), so re-reading an unchanged config file
+# costs a single stat() instead of an open + JSON parse
+_config_file_cache = {}
+
+def _read_config_file(config_path):
+    mtime_ns = os.stat(config_path).st_mtime_ns
+    cached = _config_file_cache.get(config_path)
+    if cached and cached[0] == mtime_ns:
+        return cached[1]
+    
+    with open(config_path, "rb") as file:
+        data = _json.loads(file.read())
+    
+    _config_file_cache[config_path] = (mtime_ns, data)
+    return data
+
 def load_config():
     config = {
         "download_path": "../../shared/",
@@ -15,36 +35,61 @@ def load_config():
     
     config_path = "../config/config.json"
     try:
-        with open(config_path, "r") as file:
-            data = json.load(file)
-            config.update(data)
-    except (FileNotFoundError, json.JSONDecodeError) as e:
-        logger.logger.error(f"Config error, using defaults: {e}")
+        config.update(_read_config_file(config_path))
+    except (FileNotFoundError, ValueError) as e:
+        logger.logger.error("Config error, using defaults: %s", e)
     
     config["download_path"] = os.path.abspath(os.path.expanduser(config["download_path"]))
     # Use the download path directly instead of its parent directory
     config["db_path"] = os.path.join(config["download_path"], "musicbot.db")
     
-    os.makedirs(config["download_path"], exist_ok=True)
-    logger.logger.info(f"Download directory ready: {config['download_path']}")
-    logger.logger.info(f"Database path: {config['db_path']}")
-    
     return config
 
+_config = None
+
+def get_config():
+    # Loaded on first use instead of at import, so importing this module
+    # never touches the filesystem
+    global _config
+    if _config is None:
+        _config = load_config()
+    return _config
+
+def ensure_download_dir(config):
+    os.makedirs(config["download_path"], exist_ok=True)
+    logger.logger.info("Download directory ready: %s", config["download_path"])
+    logger.logger.info("Database path: %s", config["db_path"])
+
+SQLITE_MAGIC = b"SQLite format 3\x00"
+
 def ensure_database_exists(db_path):
-    if not os.path.exists(db_path):
-        logger.logger.warning(f"Database file not found at: {db_path}")
+    # One open + read(16) both checks existence and catches files that are
+    # not SQLite databases (truncated, corrupt, wrong path)
+    try:
+        with open(db_path, "rb") as file:
+            header = file.read(16)
+    except FileNotFoundError:
+        logger.logger.warning("Database file not found at: %s", db_path)
         logger.logger.warning("Please run the database initializer before starting the downloader")
         logger.logger.warning("Command: cd ../shared && go build -o db_init db_initializer.go && ./db_init -path .")
         return False
+    except OSError as e:
+        logger.logger.warning("Could not read database file %s: %s", db_path, e)
+        return False
+    
+    if header != SQLITE_MAGIC:
+        logger.logger.warning("File at %s is not a valid SQLite database", db_path)
+        logger.logger.warning("Please re-run the database initializer to recreate it")
+        return False
     return True
 
 def main():
-    config = load_config()
+    config = get_config()
+    ensure_download_dir(config)
     logger.logger.info("Reading configuration...")
-    logger.logger.info(f"Downloading files to: {config['download_path']}")
-    logger.logger.info(f"Using socket at: {config['uds_link']}")
-    logger.logger.info(f"Allowed origins: {config['allowed_origins']}")
+    logger.logger.info("Downloading files to: %s", config["download_path"])
+    logger.logger.info("Using socket at: %s", config["uds_link"])
+    logger.logger.info("Allowed origins: %s", config["allowed_origins"])
     
     db_exists = ensure_database_exists(config["db_path"])
     if not db_exists:
@@ -54,27 +99,27 @@ def main():
     uds_handler.initialize(config)
     
     if uds_handler.start_server():
-        logger.logger.info(f"UDS server listening on {config['uds_link']}")
+        logger.logger.info("UDS server listening on %s", config["uds_link"])
     else:
         logger.logger.error("Failed to start UDS server")
     
+    stop_event = threading.Event()
+    
     def shutdown_handler(sig, frame):
-        logger.logger.info("\nShutting down gracefully...")
-        uds_handler.stop_server()
-        logger.logger.info("Goodbye!")
-        exit(0)
+        stop_event.set()
     
     signal.signal(signal.SIGINT, shutdown_handler)
     signal.signal(signal.SIGTERM, shutdown_handler)
     
     logger.logger.info("\nServer is running. Press Ctrl+C to exit.")
     try:
-        while True:
-            time.sleep(1)
-    except KeyboardInterrupt:
-        pass
+        # Sleep until a signal arrives instead of waking up every second
+        stop_event.wait()
     finally:
-        shutdown_handler(None, None)
+        logger.logger.info("\nShutting down gracefully...")
+        uds_handler.stop_server()
+        ytdlp_handler.shutdown()
+        logger.logger.info("Goodbye!")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
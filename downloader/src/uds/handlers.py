@@ -1,12 +1,46 @@
 import ytdlp_handler
-import json
 import time
-import traceback
+import types
+import logging
+import logger
+from cache import TTLCache
 from uds import protocol
 
 _config = {}
 _command_handlers = {}
-_event_listeners = []
+# Replaced, never mutated: registration builds a new tuple, so the event
+# loop iterates a fixed snapshot even while another thread registers
+_event_listeners = ()
+_defaults_registered = False
+
+# Read-only live view used for dispatch. register_handler still writes to
+# _command_handlers, and the view sees those changes.
+_command_handlers_ro = types.MappingProxyType(_command_handlers)
+_get_handler = _command_handlers_ro.get
+_success_response = protocol.create_success_response
+_error_response = protocol.create_error_response
+
+# Durations are measured on the monotonic clock, which NTP adjustments
+# can't push backwards. time.time() is only used for wall-clock fields.
+_now = time.monotonic
+
+# Search and playlist-info results, retried searches and repeated lookups
+# are answered without going back to yt-dlp
+_result_cache = TTLCache(maxsize=256, ttl=60.0)
+
+def _cache_key(*parts):
+    # Keys are built from client params as they arrived. A request with a
+    # value that can't be hashed (a list, an object) isn't cached.
+    try:
+        hash(parts)
+    except TypeError:
+        return None
+    return parts
+
+def _forget_playlist_info(url):
+    # A download changes what is stored for the playlist, drop cached info
+    # for it regardless of max_items
+    _result_cache.discard_where(lambda key: key[0] == "pi" and key[1] == url)
 
 def init(cfg):
     global _config
@@ -16,7 +50,7 @@ def init(cfg):
     
     ytdlp_handler.register_event_callback(handle_ytdlp_event)
     
-    print("UDS handlers module initialized")
+    logger.logger.info("UDS handlers module initialized")
 
 def register_handler(command, handler_func):
     if not callable(handler_func):
@@ -28,19 +62,26 @@ def register_handler(command, handler_func):
 def register_event_listener(listener_func):
     global _event_listeners
     if callable(listener_func) and listener_func not in _event_listeners:
-        _event_listeners.append(listener_func)
+        _event_listeners = _event_listeners + (listener_func,)
         return True
     return False
 
 def handle_ytdlp_event(event_type, event_data):
-    for listener in _event_listeners:
+    listeners = _event_listeners
+    for listener in listeners:
         try:
             listener(event_type, event_data)
         except Exception as e:
-            print(f"Error in event listener: {e}")
-            print(traceback.format_exc())
+            logger.logger.error("Error in event listener: %s", e, exc_info=True)
 
 def register_default_handlers():
+    # init() may run more than once (re-initialization, reloads); the
+    # defaults are only registered the first time
+    global _defaults_registered
+    if _defaults_registered:
+        return
+    _defaults_registered = True
+    
     register_handler("download_audio", handle_download_audio)
     register_handler("download_playlist", handle_download_playlist)
     register_handler("download_playlist_item", handle_download_playlist_item)
@@ -55,58 +96,63 @@ def process_request(request, config):
     request_id = request.get("id")
     params = request.get("params", {})
     
-    start_time = time.time()
+    # Pings are by far the most common request (the bot sends a keepalive
+    # every 90s), so answer them directly without logging or a handler call.
+    # handle_ping stays registered and builds the same payload.
+    if command == "ping":
+        data = {
+            "message": "pong",
+            "timestamp": params.get("timestamp", "none"),
+            "server_time": time.time()
+        }
+        if params.get("keepalive"):
+            data["keepalive"] = True
+        return _success_response(request_id, data)
     
-    if command == "ping" and params.get("keepalive"):
-        print(f"UDS: Received keepalive ping - ID: {request_id}")
-    else:
-        print(f"UDS: Received request - Command: {command}, ID: {request_id}")
+    start_time = _now()
     
-    handler = _command_handlers.get(command)
+    handler = _get_handler(command)
     
     if not handler:
-        print(f"UDS: Unknown command: {command}")
-        return protocol.create_error_response(
+        logger.logger.warning("UDS: Unknown command: %s", command)
+        return _error_response(
             f"Unknown command: {command}", 
             request_id
         )
     
     try:
-        if command == "ping" and params.get("keepalive"):
-            print(f"UDS: Processing keepalive ping")
-        else:
-            print(f"UDS: Processing {command} with params: {json.dumps(params, default=str)}")
+        # Per-request detail is debug only; %s formatting of params is
+        # deferred by the logger, so nothing is built when DEBUG is off
+        if logger.logger.isEnabledFor(logging.DEBUG):
+            logger.logger.debug("UDS: Processing %s (ID: %s) params=%s", command, request_id, params)
         
         result = handler(params, config)
-        elapsed = time.time() - start_time
+        elapsed = _now() - start_time
         
-        if command == "ping" and params.get("keepalive"):
-            print(f"UDS: Keepalive ping processed successfully in {elapsed:.3f} seconds")
-        else:
-            print(f"UDS: {command} processed successfully in {elapsed:.2f} seconds")
+        logger.logger.info("UDS: %s processed in %.2f seconds", command, elapsed)
         
-        return protocol.create_success_response(request_id, result)
+        return _success_response(request_id, result)
     except Exception as e:
-        elapsed = time.time() - start_time
-        print(f"UDS: Error processing {command} after {elapsed:.2f} seconds: {str(e)}")
-        print(f"UDS: Traceback: {traceback.format_exc()}")
-        return protocol.create_error_response(
+        elapsed = _now() - start_time
+        logger.logger.error("UDS: Error processing %s after %.2f seconds: %s", command, elapsed, e, exc_info=True)
+        return _error_response(
             f"Error processing {command}: {str(e)}", 
             request_id
         )
 
 def handle_download_audio(params, config):
-    url = params.get("url")
+    get = params.get
+    url = get("url")
     
     if not url:
-        print("UDS: URL is required for download_audio")
+        logger.logger.warning("UDS: URL is required for download_audio")
         raise ValueError("URL is required")
     
-    max_duration = params.get("max_duration_seconds")
-    max_size = params.get("max_size_mb")
-    allow_live = params.get("allow_live", False)
+    max_duration = get("max_duration_seconds")
+    max_size = get("max_size_mb")
+    allow_live = get("allow_live", False)
     
-    print(f"UDS: Downloading audio from URL: {url}")
+    logger.logger.debug("UDS: Downloading audio from URL: %s", url)
     result = ytdlp_handler.download_audio(
         url, 
         max_duration_seconds=max_duration, 
@@ -115,31 +161,32 @@ def handle_download_audio(params, config):
     )
     
     if not result:
-        print(f"UDS: Download failed for URL: {url}")
+        logger.logger.warning("UDS: Download failed for URL: %s", url)
         raise Exception("Download failed")
     
-    print(f"UDS: Download completed for URL: {url}")
+    logger.logger.debug("UDS: Download completed for URL: %s", url)
     if "title" in result:
-        print(f"UDS: Downloaded: {result['title']}")
+        logger.logger.debug("UDS: Downloaded: %s", result['title'])
         
     return result
 
 def handle_download_playlist(params, config):
-    url = params.get("url")
+    get = params.get
+    url = get("url")
     
     if not url:
-        print("UDS: URL is required for download_playlist")
+        logger.logger.warning("UDS: URL is required for download_playlist")
         raise ValueError("URL is required")
     
-    max_items = params.get("max_items")
-    max_duration = params.get("max_duration_seconds")
-    max_size = params.get("max_size_mb")
-    allow_live = params.get("allow_live", False)
-    requester = params.get("requester")
-    guild_id = params.get("guild_id")
+    max_items = get("max_items")
+    max_duration = get("max_duration_seconds")
+    max_size = get("max_size_mb")
+    allow_live = get("allow_live", False)
+    requester = get("requester")
+    guild_id = get("guild_id")
     
-    print(f"UDS: Downloading playlist from URL: {url}, max items: {max_items}")
-    start_time = time.time()
+    logger.logger.debug("UDS: Downloading playlist from URL: %s, max items: %s", url, max_items)
+    start_time = _now()
     
     result = ytdlp_handler.download_playlist(
         url, 
@@ -151,33 +198,35 @@ def handle_download_playlist(params, config):
         guild_id=guild_id
     )
     
-    elapsed = time.time() - start_time
+    elapsed = _now() - start_time
+    _forget_playlist_info(url)
     
     if not result:
-        print(f"UDS: Playlist download failed for URL: {url} after {elapsed:.2f} seconds")
+        logger.logger.warning("UDS: Playlist download failed for URL: %s after %.2f seconds", url, elapsed)
         raise Exception("Playlist download failed")
     
     item_count = result.get("count", 0)
     successful = result.get("successful_downloads", 0)
-    print(f"UDS: Playlist download completed in {elapsed:.2f} seconds, {successful} of {item_count} tracks downloaded")
+    logger.logger.debug("UDS: Playlist download completed in %.2f seconds, %s of %s tracks downloaded", elapsed, successful, item_count)
         
     return result
 
 def handle_start_playlist_download(params, config):
-    url = params.get("url")
+    get = params.get
+    url = get("url")
     
     if not url:
-        print("UDS: URL is required for start_playlist_download")
+        logger.logger.warning("UDS: URL is required for start_playlist_download")
         raise ValueError("URL is required")
     
-    max_items = params.get("max_items")
-    max_duration = params.get("max_duration_seconds")
-    max_size = params.get("max_size_mb")
-    allow_live = params.get("allow_live", False)
-    requester = params.get("requester")
-    guild_id = params.get("guild_id")
+    max_items = get("max_items")
+    max_duration = get("max_duration_seconds")
+    max_size = get("max_size_mb")
+    allow_live = get("allow_live", False)
+    requester = get("requester")
+    guild_id = get("guild_id")
     
-    print(f"UDS: Starting async playlist download from URL: {url}, max items: {max_items}")
+    logger.logger.debug("UDS: Starting async playlist download from URL: %s, max items: %s", url, max_items)
     
     result = ytdlp_handler.start_playlist_download(
         url, 
@@ -188,12 +237,13 @@ def handle_start_playlist_download(params, config):
         requester=requester,
         guild_id=guild_id
     )
+    _forget_playlist_info(url)
     
     if not result or result.get("status") == "error":
-        print(f"UDS: Starting playlist download failed for URL: {url}")
+        logger.logger.warning("UDS: Starting playlist download failed for URL: %s", url)
         raise Exception(result.get("message", "Starting playlist download failed"))
     
-    print(f"UDS: Started playlist download for '{result.get('playlist_title')}' with {result.get('total_tracks')} tracks")
+    logger.logger.debug("UDS: Started playlist download for '%s' with %s tracks", result.get('playlist_title'), result.get('total_tracks'))
     
     return result
 
@@ -201,7 +251,7 @@ def handle_get_playlist_download_status(params, config):
     playlist_id = params.get("playlist_id")
     
     if not playlist_id:
-        print("UDS: playlist_id is required for get_playlist_download_status")
+        logger.logger.warning("UDS: playlist_id is required for get_playlist_download_status")
         raise ValueError("playlist_id is required")
     
     return {
@@ -216,48 +266,58 @@ def handle_get_playlist_info(params, config):
     url = params.get("url")
     
     if not url:
-        print("UDS: URL is required for get_playlist_info")
+        logger.logger.warning("UDS: URL is required for get_playlist_info")
         raise ValueError("URL is required")
     
     max_items = params.get("max_items")
     
-    print(f"UDS: Getting playlist info from URL: {url}, max items: {max_items}")
-    start_time = time.time()
+    cache_key = _cache_key("pi", url, max_items)
+    cached = _result_cache.get(cache_key) if cache_key else None
+    if cached is not None:
+        logger.logger.debug("UDS: Playlist info for %s served from cache", url)
+        return cached
+    
+    logger.logger.debug("UDS: Getting playlist info from URL: %s, max items: %s", url, max_items)
+    start_time = _now()
     
     result = ytdlp_handler.get_playlist_info(
         url, 
         max_items=max_items
     )
     
-    elapsed = time.time() - start_time
+    elapsed = _now() - start_time
     
     if not result:
-        print(f"UDS: Getting playlist info failed for URL: {url} after {elapsed:.2f} seconds")
+        logger.logger.warning("UDS: Getting playlist info failed for URL: %s after %.2f seconds", url, elapsed)
         raise Exception("Getting playlist info failed")
     
     item_count = result.get("total_tracks", 0)
-    print(f"UDS: Playlist info retrieved in {elapsed:.2f} seconds, found {item_count} tracks")
+    logger.logger.debug("UDS: Playlist info retrieved in %.2f seconds, found %s tracks", elapsed, item_count)
+    
+    if cache_key and result.get("status") == "success":
+        _result_cache.put(cache_key, result)
         
     return result
 
 def handle_download_playlist_item(params, config):
-    url = params.get("url")
+    get = params.get
+    url = get("url")
     
     if not url:
-        print("UDS: URL is required for download_playlist_item")
+        logger.logger.warning("UDS: URL is required for download_playlist_item")
         raise ValueError("URL is required")
     
-    index = params.get("index")
+    index = get("index")
     if index is None:
-        print("UDS: Index is required for download_playlist_item")
+        logger.logger.warning("UDS: Index is required for download_playlist_item")
         raise ValueError("Index is required")
     
-    max_duration = params.get("max_duration_seconds")
-    max_size = params.get("max_size_mb")
-    allow_live = params.get("allow_live", False)
+    max_duration = get("max_duration_seconds")
+    max_size = get("max_size_mb")
+    allow_live = get("allow_live", False)
     
-    print(f"UDS: Downloading playlist item {index} from URL: {url}")
-    start_time = time.time()
+    logger.logger.debug("UDS: Downloading playlist item %s from URL: %s", index, url)
+    start_time = _now()
     
     result = ytdlp_handler.download_playlist_item(
         url, 
@@ -267,31 +327,38 @@ def handle_download_playlist_item(params, config):
         allow_live=allow_live
     )
     
-    elapsed = time.time() - start_time
+    elapsed = _now() - start_time
     
     if not result:
-        print(f"UDS: Playlist item download failed for URL: {url}, index: {index} after {elapsed:.2f} seconds")
+        logger.logger.warning("UDS: Playlist item download failed for URL: %s, index: %s after %.2f seconds", url, index, elapsed)
         raise Exception(f"Playlist item download failed for index {index}")
     
-    print(f"UDS: Playlist item download completed in {elapsed:.2f} seconds")
+    logger.logger.debug("UDS: Playlist item download completed in %.2f seconds", elapsed)
     if "title" in result:
-        print(f"UDS: Downloaded: {result['title']}")
+        logger.logger.debug("UDS: Downloaded: %s", result['title'])
         
     return result
 
 def handle_search(params, config):
-    query = params.get("query")
+    get = params.get
+    query = get("query")
     
     if not query:
-        print("UDS: Search query is required")
+        logger.logger.warning("UDS: Search query is required")
         raise ValueError("Search query is required")
     
-    platform = params.get("platform", "youtube")
-    limit = params.get("limit", 5)
-    include_live = params.get("include_live", False)
+    platform = get("platform", "youtube")
+    limit = get("limit", 5)
+    include_live = get("include_live", False)
     
-    print(f"UDS: Searching for '{query}' on {platform}, limit: {limit}")
-    start_time = time.time()
+    cache_key = _cache_key("s", query, platform, limit, include_live)
+    cached = _result_cache.get(cache_key) if cache_key else None
+    if cached is not None:
+        logger.logger.debug("UDS: Search for '%s' served from cache", query)
+        return cached
+    
+    logger.logger.debug("UDS: Searching for '%s' on %s, limit: %s", query, platform, limit)
+    start_time = _now()
     
     results = ytdlp_handler.search(
         query, 
@@ -300,17 +367,21 @@ def handle_search(params, config):
         include_live=include_live
     )
     
-    elapsed = time.time() - start_time
+    elapsed = _now() - start_time
     
     if not results:
-        print(f"UDS: No search results found after {elapsed:.2f} seconds")
+        logger.logger.debug("UDS: No search results found after %.2f seconds", elapsed)
         return {"results": []}
     
     result_count = 0
     if "results" in results and isinstance(results["results"], list):
         result_count = len(results["results"])
     
-    print(f"UDS: Search completed in {elapsed:.2f} seconds, found {result_count} results")
+    logger.logger.debug("UDS: Search completed in %.2f seconds, found %s results", elapsed, result_count)
+    
+    # Errors and empty searches are not cached so a retry really retries
+    if cache_key and result_count and results.get("status") != "error":
+        _result_cache.put(cache_key, results)
         
     return results
 
@@ -318,11 +389,6 @@ def handle_ping(params, config):
     is_keepalive = params.get("keepalive", False)
     timestamp = params.get("timestamp", "none")
     
-    if is_keepalive:
-        print("UDS: Received keepalive ping request")
-    else:
-        print("UDS: Received ping request")
-    
     response = {
         "message": "pong",
         "timestamp": timestamp,
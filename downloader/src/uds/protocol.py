@@ -1,13 +1,25 @@
-import json
+import time
 import uuid
-from datetime import datetime
+from datetime import datetime, timezone
+import logger
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+    import json
+
+try:
+    import fastjsonschema
+except ImportError:
+    fastjsonschema = None
 
 _config = {}
 
 def init(cfg):
     global _config
     _config.update(cfg)
-    print("UDS protocol module initialized")
+    logger.logger.debug("UDS protocol module initialized")
 
 REQUEST_SCHEMA = {
     "type": "object",
@@ -44,25 +56,74 @@ EVENT_SCHEMA = {
     }
 }
 
-def validate_request(request):
-    if not isinstance(request, dict):
-        return False
-    
-    if "command" not in request or not isinstance(request["command"], str):
-        return False
+# (time.time() it was made at, ISO string). Responses built within the same
+# millisecond share the string instead of each formatting a new datetime.
+# The tuple is swapped as a whole, so concurrent callers at worst format it
+# twice.
+_ts_cache = (0.0, "")
+
+def _now_iso():
+    global _ts_cache
+    now = time.time()
+    cached = _ts_cache
+    if now - cached[0] > 0.001:
+        cached = (now, datetime.fromtimestamp(now, timezone.utc).replace(tzinfo=None).isoformat())
+        _ts_cache = cached
+    return cached[1]
+
+if orjson is not None:
+    # orjson parses and serializes in C and produces bytes directly.
+    # OPT_NON_STR_KEYS keeps the stdlib behaviour of stringifying int keys.
+    def loads(data):
+        return orjson.loads(data)
+
+    def dumps(obj):
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS)
+else:
+    def loads(data):
+        return json.loads(data)
+
+    def dumps(obj):
+        return json.dumps(obj, default=str).encode('utf-8')
+
+if fastjsonschema is not None:
+    # Compiled once at import into a specialized validator for REQUEST_SCHEMA
+    _validate_request_schema = fastjsonschema.compile(REQUEST_SCHEMA)
+
+    def validate_request(request):
+        try:
+            _validate_request_schema(request)
+            return True
+        except fastjsonschema.JsonSchemaException:
+            return False
+else:
+    def validate_request(request):
+        # Same rules as REQUEST_SCHEMA, including the optional params and
+        # timestamp fields. Parsed JSON only produces exact types, so plain
+        # type() checks are enough.
+        if type(request) is not dict:
+            return False
         
-    if "id" not in request or not isinstance(request["id"], str):
-        return False
-    
-    return True
+        get = request.get
+        if type(get("command")) is not str or type(get("id")) is not str:
+            return False
+        
+        if "params" in request and type(request["params"]) is not dict:
+            return False
+        
+        if "timestamp" in request and type(request["timestamp"]) is not str:
+            return False
+        
+        return True
 
 def parse_request(data):
     try:
-        request = json.loads(data)
+        request = loads(data)
         if not validate_request(request):
             return None
         return request
-    except json.JSONDecodeError:
+    except ValueError:
+        # orjson.JSONDecodeError and json.JSONDecodeError are both ValueErrors
         return None
 
 def create_success_response(request_id, data=None):
@@ -70,7 +131,7 @@ def create_success_response(request_id, data=None):
         "type": "response",
         "status": "success",
         "id": request_id,
-        "timestamp": datetime.utcnow().isoformat()
+        "timestamp": _now_iso()
     }
     
     if data is not None:
@@ -87,16 +148,49 @@ def create_error_response(error_message, request_id=None):
         "status": "error",
         "id": request_id,
         "error": error_message,
-        "timestamp": datetime.utcnow().isoformat()
+        "timestamp": _now_iso()
     }
 
+# Keepalive pongs are the most frequent response and only differ in four
+# values, so they are spliced into a fixed JSON template instead of being
+# built as nested dicts and serialized. The string fields go through dumps()
+# so they are quoted and escaped exactly as in any other response.
+_KEEPALIVE_TEMPLATE = (
+    b'{"type":"response","status":"success","id":%s,"timestamp":%s,'
+    b'"data":{"message":"pong","timestamp":%s,"server_time":%.6f,"keepalive":true}}'
+)
+
+def create_keepalive_response(request_id, client_timestamp="none"):
+    """Serialized keepalive pong, ready for utils.frame_message"""
+    return _KEEPALIVE_TEMPLATE % (
+        dumps(request_id),
+        dumps(_now_iso()),
+        dumps(client_timestamp),
+        time.time()
+    )
+
+# The one fixed error the server sends for frames that aren't a valid
+# request. Only the generated id and the timestamp change, and neither needs
+# escaping beyond what dumps() does for the timestamp.
+_INVALID_REQUEST_TEMPLATE = (
+    b'{"type":"response","status":"error","id":"%s",'
+    b'"error":"Invalid request format","timestamp":%s}'
+)
+
+def create_invalid_request_response():
+    """Serialized "Invalid request format" error, ready for utils.frame_message"""
+    return _INVALID_REQUEST_TEMPLATE % (
+        str(uuid.uuid4()).encode(),
+        dumps(_now_iso())
+    )
+
 def create_event_message(event_type, data=None):
     """Create an event message to send to clients"""
     event = {
         "type": "event",
         "event": event_type,
         "id": str(uuid.uuid4()),
-        "timestamp": datetime.utcnow().isoformat()
+        "timestamp": _now_iso()
     }
     
     if data is not None:
@@ -1,17 +1,117 @@
 import socket
 import os
+import logging
+import queue
+import selectors
+import itertools
 import threading
 import time
 import traceback
-import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from uds import handlers, utils, protocol
 import logger
 
 _socket = None
-_thread = None
+_accept_thread = None
+_reactors = []
+_pool = None
 _running = False
 _config = {}
-_clients = {}
+
+# Client ids only need to be unique within this process
+_client_ids = itertools.count(1)
+
+# Selector key of a reactor's wakeup pipe, every other key is a client id
+_WAKEUP = object()
+
+# How often idle clients are looked for, the idle limits are in minutes
+_IDLE_CHECK_INTERVAL = 10.0
+
+# Kernel send/receive buffer requested for each client, large enough that
+# most responses fit in a single write. Linux caps it at wmem_max/rmem_max.
+_SOCKET_BUFFER_SIZE = 4 * 1024 * 1024
+
+# Outgoing bytes a client may leave unread before it is disconnected, so a
+# client that stopped reading can't grow its buffer without bound
+_MAX_OUTBOX = 64 * 1024 * 1024
+
+# sendmsg takes at most this many buffers per call (IOV_MAX on Linux)
+_IOV_MAX = 1024
+
+class _Reactor:
+    """One selector loop thread and the clients assigned to it. The clients
+    dict and the selector are only touched by the loop thread, other threads
+    hand it work with call_soon()."""
+
+    def __init__(self, index):
+        self.index = index
+        self.selector = selectors.DefaultSelector()
+        self.clients = {}
+        self.inbox = queue.SimpleQueue()
+        
+        # Accepted sockets waiting for this loop to register them. deque
+        # append and popleft are atomic, so the accept thread and the loop
+        # need no lock.
+        self.pending = deque()
+        
+        # stop(), the accept thread and call_soon() signal this fd to wake
+        # the loop out of select(). An eventfd is a single fd with a counter
+        # instead of a pipe's two fds and buffer; the pipe is the fallback
+        # where os.eventfd isn't available.
+        if hasattr(os, "eventfd"):
+            self.wakeup_r = self.wakeup_w = os.eventfd(0, os.EFD_NONBLOCK | os.EFD_CLOEXEC)
+        else:
+            self.wakeup_r, self.wakeup_w = os.pipe()
+            os.set_blocking(self.wakeup_r, False)
+            os.set_blocking(self.wakeup_w, False)
+        self.selector.register(self.wakeup_r, selectors.EVENT_READ, _WAKEUP)
+        
+        self.thread = threading.Thread(target=_server_loop, args=(self,), name=f"uds-loop-{index}", daemon=True)
+
+    def wakeup(self):
+        try:
+            if self.wakeup_r == self.wakeup_w:
+                os.eventfd_write(self.wakeup_w, 1)
+            else:
+                os.write(self.wakeup_w, b'\x01')
+        except OSError:
+            # Counter or pipe full (a wakeup is already pending), or closed
+            pass
+
+    def call_soon(self, func, *args):
+        self.inbox.put((func, args))
+        self.wakeup()
+
+    def run_inbox(self):
+        while True:
+            try:
+                func, args = self.inbox.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                func(*args)
+            except Exception as e:
+                logger.logger.error("Error in server loop %s callback: %s", self.index, e)
+
+    def unregister(self, client_socket):
+        try:
+            self.selector.unregister(client_socket)
+        except (KeyError, ValueError, RuntimeError):
+            pass
+
+    def close(self):
+        while self.pending:
+            client, _ = self.pending.popleft()
+            client.close()
+        
+        self.selector.close()
+        
+        for fd in {self.wakeup_r, self.wakeup_w}:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
 
 def init(cfg):
     global _config
@@ -22,7 +122,7 @@ def init(cfg):
     logger.logger.info("UDS server module initialized")
 
 def start(socket_path, allowed_origins):
-    global _socket, _thread, _running
+    global _socket, _accept_thread, _reactors, _pool, _running
     
     if _running:
         logger.logger.warning("Server already running")
@@ -33,213 +133,492 @@ def start(socket_path, allowed_origins):
         _socket.bind(socket_path)
         _socket.listen(5)
         
+        # Clients are spread over a few selector loops, each with its own
+        # thread, instead of every socket going through one
+        reactor_count = _config.get("uds_reactors") or min(os.cpu_count() or 1, 8)
+        _reactors = [_Reactor(i) for i in range(reactor_count)]
+        
+        # Client handlers run on a bounded set of reused threads instead of
+        # one new thread per accepted connection
+        _pool = ThreadPoolExecutor(
+            max_workers=_config.get("uds_workers", 16),
+            thread_name_prefix="uds"
+        )
+        
         _running = True
-        _thread = threading.Thread(target=_server_loop, daemon=True)
-        _thread.start()
+        for reactor in _reactors:
+            reactor.thread.start()
         
-        logger.logger.info(f"UDS server started on {socket_path}")
+        # accept() blocks on its own thread so new connections never wait
+        # behind a loop, and the loops never poll the listening socket
+        _accept_thread = threading.Thread(target=_accept_loop, name="uds-accept", daemon=True)
+        _accept_thread.start()
+        
+        logger.logger.info("UDS server started on %s with %s loop threads", socket_path, reactor_count)
         return True
     except Exception as e:
-        logger.logger.error(f"Failed to start UDS server: {e}")
+        logger.logger.error("Failed to start UDS server: %s", e)
+        _running = False
+        for reactor in _reactors:
+            reactor.close()
+        _reactors = []
+        if _pool:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
         if _socket:
             _socket.close()
             _socket = None
         return False
 
 def stop():
-    global _socket, _thread, _running, _clients
+    global _socket, _accept_thread, _reactors, _pool, _running
     
     if not _running:
         return False
     
     try:
         _running = False
+        for reactor in _reactors:
+            reactor.wakeup()
         
-        for client_id, client_data in list(_clients.items()):
+        # shutdown() makes the blocked accept() return, close() alone does not
+        if _socket:
             try:
-                if client_data['socket']:
-                    client_data['socket'].close()
-            except Exception as e:
-                logger.logger.error(f"Error closing client connection {client_id}: {e}")
+                _socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
         
-        _clients.clear()
+        if _accept_thread and _accept_thread.is_alive():
+            _accept_thread.join(timeout=3.0)
+        
+        for reactor in _reactors:
+            if reactor.thread.is_alive():
+                reactor.thread.join(timeout=3.0)
+        
+        # The loop threads have exited, so their client dicts can be
+        # emptied from here
+        for reactor in _reactors:
+            for client_id, client_data in list(reactor.clients.items()):
+                try:
+                    if client_data['socket']:
+                        client_data['socket'].close()
+                except Exception as e:
+                    logger.logger.error("Error closing client connection %s: %s", client_id, e)
+            
+            reactor.clients.clear()
         
         if _socket:
             _socket.close()
             _socket = None
         
-        if _thread and _thread.is_alive():
-            _thread.join(timeout=3.0)
+        if _pool:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+        
+        for reactor in _reactors:
+            reactor.close()
+        _reactors = []
         
         logger.logger.info("UDS server stopped")
         return True
     except Exception as e:
-        logger.logger.error(f"Error stopping UDS server: {e}")
+        logger.logger.error("Error stopping UDS server: %s", e)
         return False
 
-def _server_loop():
-    global _socket, _running
+def _server_loop(reactor):
+    logger.logger.info("UDS server loop %s started", reactor.index)
     
-    logger.logger.info("UDS server loop started")
+    # Each loop waits on all of its idle clients at once, reading whatever
+    # arrives into the client's buffer. Only a client with a complete
+    # message is handed to the pool, so neither idle keepalive connections
+    # nor slow senders hold a worker thread.
+    selector = reactor.selector
+    next_idle_check = time.monotonic() + _IDLE_CHECK_INTERVAL
     
-    while _running and _socket:
+    while _running:
         try:
-            _socket.settimeout(1.0)
-            client, _ = _socket.accept()
-            _socket.settimeout(None)
-            
-            client_id = str(uuid.uuid4())
+            events = selector.select(timeout=max(0.0, next_idle_check - time.monotonic()))
             
-            logger.logger.info(f"New client connection accepted (ID: {client_id})")
-            
-            _clients[client_id] = {
-                'socket': client,
-                'connected': True,
-                'last_activity': time.time(),
-                'last_keepalive': time.time()
-            }
+            for key, mask in events:
+                if key.data is _WAKEUP:
+                    try:
+                        os.read(reactor.wakeup_r, 4096)
+                    except BlockingIOError:
+                        pass
+                    _register_pending_clients(reactor)
+                    reactor.run_inbox()
+                    continue
+                
+                if mask & selectors.EVENT_WRITE:
+                    _flush_client(reactor, key.data)
+                if mask & selectors.EVENT_READ:
+                    _read_client(reactor, key.fileobj, key.data)
             
-            client_thread = threading.Thread(
-                target=_handle_client,
-                args=(client, client_id),
-                daemon=True
-            )
-            client_thread.start()
-        except socket.timeout:
+            now = time.monotonic()
+            if now >= next_idle_check:
+                next_idle_check = now + _IDLE_CHECK_INTERVAL
+                _close_idle_clients(reactor)
+        except (BlockingIOError, InterruptedError):
             continue
-        except ConnectionAbortedError:
-            break
         except Exception as e:
             if _running:
-                logger.logger.error(f"Error in server loop: {e}")
-                logger.logger.debug(f"Traceback: {traceback.format_exc()}")
+                logger.logger.error("Error in server loop %s: %s", reactor.index, e)
+                if logger.logger.isEnabledFor(logging.DEBUG):
+                    logger.logger.debug("Traceback: %s", traceback.format_exc())
             break
     
-    logger.logger.info("Server loop terminated")
+    logger.logger.info("Server loop %s terminated", reactor.index)
+
+def _accept_loop():
+    logger.logger.info("UDS accept loop started")
+    
+    while _running:
+        try:
+            client, _ = _socket.accept()
+        except OSError as e:
+            if not _running:
+                break
+            # Typically out of file descriptors, don't spin on it
+            logger.logger.error("Error accepting connection: %s", e)
+            time.sleep(0.1)
+            continue
+        
+        # The client's loop does all reads and writes, each only after
+        # select() reported the socket ready, so the socket never blocks
+        client.setblocking(False)
+        
+        buffer_size = _config.get("uds_socket_buffer", _SOCKET_BUFFER_SIZE)
+        try:
+            client.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, buffer_size)
+            client.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, buffer_size)
+        except OSError as e:
+            logger.logger.debug("Could not resize client socket buffers: %s", e)
+        
+        client_id = next(_client_ids)
+        reactor = _reactors[client_id % len(_reactors)]
+        reactor.pending.append((client, client_id))
+        reactor.wakeup()
+    
+    logger.logger.info("Accept loop terminated")
 
-def _handle_client(client_socket, client_id):
-    global _clients
+def _register_pending_clients(reactor):
+    while reactor.pending:
+        client, client_id = reactor.pending.popleft()
+        
+        logger.logger.info("New client connection accepted (ID: %s)", client_id)
+        
+        # Idle bookkeeping uses the monotonic clock so wall clock changes
+        # can't expire or keep alive a connection
+        now = time.monotonic()
+        
+        # outbox holds the headers and payloads the client hasn't taken
+        # yet, outbox_size their total length. events is the selector mask
+        # the socket is registered with, 0 if it isn't.
+        reactor.clients[client_id] = {
+            'socket': client,
+            'id': client_id,
+            'reactor': reactor,
+            'busy': False,
+            'closing': False,
+            'read_state': utils.new_read_state(),
+            'outbox': deque(),
+            'outbox_size': 0,
+            'events': selectors.EVENT_READ,
+            'last_activity': now,
+            'last_keepalive': now
+        }
+        
+        reactor.selector.register(client, selectors.EVENT_READ, client_id)
+
+def _read_client(reactor, client_socket, client_id):
+    client_data = reactor.clients.get(client_id)
+    if client_data is None:
+        reactor.unregister(client_socket)
+        return
+    
+    read_state = client_data['read_state']
     
     try:
-        client_socket.settimeout(600)  # 10 minute initial timeout
-        logger.logger.info(f"Starting client handler for {client_id}")
+        received = utils.receive_available(client_socket, read_state)
+    except (BlockingIOError, InterruptedError, socket.timeout):
+        return
+    except OSError as e:
+        logger.logger.warning("Client %s connection error: %s", client_id, e)
+        _close_client(reactor, client_id)
+        return
+    
+    if not received:
+        logger.logger.info("Client %s disconnected", client_id)
+        _close_client(reactor, client_id)
+        return
+    
+    if utils.message_ready(read_state):
+        # The pool thread owns the read buffer until it hands the client
+        # back, so one client's requests are still answered in order. Reads
+        # pause meanwhile, writes go on.
+        client_data['busy'] = True
+        _update_interest(reactor, client_data)
+        _pool.submit(_handle_client, reactor, client_data)
+
+def _close_idle_clients(reactor):
+    current_time = time.monotonic()
+    
+    for client_id, client_data in list(reactor.clients.items()):
+        # Clients with a request in progress are left alone, a download can
+        # take much longer than the idle limits
+        if client_data['busy']:
+            continue
         
-        while _running and client_id in _clients and _clients[client_id]['connected']:
-            try:
-                logger.logger.debug(f"Reading request from client {client_id}...")
-                
-                data = utils.read_json_message(client_socket)
-                if not data:
-                    logger.logger.warning(f"No data received from client {client_id}, closing connection")
-                    break
-                
-                logger.logger.debug(f"Received data of length {len(data)} from client {client_id}")
-                
-                current_time = time.time()
-                _clients[client_id]['last_activity'] = current_time
-                
-                request = protocol.parse_request(data)
-                if not request:
-                    logger.logger.warning(f"Invalid request format from client {client_id}")
-                    error_response = protocol.create_error_response("Invalid request format")
-                    utils.send_json_message(client_socket, error_response)
-                    continue
-                
-                command = request.get("command", "unknown")
-                request_id = request.get("id", "unknown")
-                
-                # Handle keepalive pings specially
-                if command == "ping":
-                    params = request.get("params", {})
-                    if params.get("keepalive"):
-                        logger.logger.debug(f"Handling keepalive ping from client {client_id}")
-                        _clients[client_id]['last_keepalive'] = current_time
-                        
-                        # Reset socket timeout for active connections
-                        client_socket.settimeout(600)  # Reset to 10 minutes
-                        
-                        # Send immediate pong response
-                        keepalive_response = protocol.create_success_response(request_id, {
-                            "message": "pong",
-                            "timestamp": params.get("timestamp", "none"),
-                            "server_time": time.time(),
-                            "keepalive": True
-                        })
-                        utils.send_json_message(client_socket, keepalive_response)
-                        continue
-                
-                logger.logger.info(f"Handling request from client {client_id} - Command: {command}, ID: {request_id}")
-                
-                response = handlers.process_request(request, _config)
-                
-                logger.logger.info(f"Sending response for {command}, ID: {request_id} to client {client_id}")
-                utils.send_json_message(client_socket, response)
-                logger.logger.info(f"Request handled - Command: {command}, ID: {request_id}, Client: {client_id}")
-                
-                # Check if we should adjust timeout based on recent activity
-                time_since_keepalive = current_time - _clients[client_id]['last_keepalive']
-                if time_since_keepalive < 300:  # If keepalive within 5 minutes, extend timeout
-                    client_socket.settimeout(600)  # 10 minutes
-                else:
-                    client_socket.settimeout(300)  # 5 minutes for inactive connections
-                
-            except socket.timeout:
-                current_time = time.time()
-                time_since_activity = current_time - _clients[client_id]['last_activity']
-                time_since_keepalive = current_time - _clients[client_id]['last_keepalive']
-                
-                # If we haven't seen keepalive in a while, close connection
-                if time_since_keepalive > 600:  # 10 minutes without keepalive
-                    logger.logger.warning(f"Client {client_id} timeout - no keepalive in {time_since_keepalive:.0f} seconds")
-                    break
-                elif time_since_activity > 300:  # 5 minutes without any activity
-                    logger.logger.warning(f"Client {client_id} timeout - no activity in {time_since_activity:.0f} seconds")
+        time_since_activity = current_time - client_data['last_activity']
+        time_since_keepalive = current_time - client_data['last_keepalive']
+        
+        if time_since_keepalive > 600:  # 10 minutes without keepalive
+            logger.logger.warning("Client %s timeout - no keepalive in %.0f seconds", client_id, time_since_keepalive)
+        elif time_since_activity > 300:  # 5 minutes without any activity
+            logger.logger.warning("Client %s timeout - no activity in %.0f seconds", client_id, time_since_activity)
+        else:
+            continue
+        
+        _close_client(reactor, client_id)
+
+def _close_client(reactor, client_id):
+    client_data = reactor.clients.pop(client_id, None)
+    if client_data is None:
+        return
+    
+    reactor.unregister(client_data['socket'])
+    # Only the loop thread reads into the scratch buffer, and this runs on
+    # it, so the buffer can go back to the pool
+    utils.release_read_state(client_data['read_state'])
+    
+    try:
+        client_data['socket'].close()
+    except:
+        pass
+    
+    logger.logger.info("Client %s connection closed", client_id)
+
+def _update_interest(reactor, client_data):
+    # Runs on the loop thread. Reads are watched while no pool thread has
+    # the client, writes while its outbox holds data.
+    events = 0
+    if not client_data['busy'] and not client_data['closing']:
+        events |= selectors.EVENT_READ
+    if client_data['outbox']:
+        events |= selectors.EVENT_WRITE
+    
+    current = client_data['events']
+    if events == current:
+        return
+    
+    client_socket = client_data['socket']
+    client_id = client_data['id']
+    try:
+        if not events:
+            reactor.selector.unregister(client_socket)
+        elif not current:
+            reactor.selector.register(client_socket, events, client_id)
+        else:
+            reactor.selector.modify(client_socket, events, client_id)
+    except (KeyError, ValueError, OSError) as e:
+        logger.logger.error("Could not update client %s in the selector: %s", client_id, e)
+        _close_client(reactor, client_id)
+        return
+    
+    client_data['events'] = events
+
+def _queue_frame(reactor, client_id, frame):
+    # Runs on the loop thread. Frames are appended in the order they were
+    # handed to the loop and written out as fast as the client reads them.
+    # Header and payload are queued as they are, the payload is never
+    # copied into a combined buffer.
+    client_data = reactor.clients.get(client_id)
+    if client_data is None:
+        return
+    
+    header, payload = frame
+    frame_size = len(header) + len(payload)
+    if client_data['outbox_size'] + frame_size > _MAX_OUTBOX:
+        logger.logger.warning("Client %s is not reading, %d bytes unsent, closing connection", client_id, client_data['outbox_size'])
+        _close_client(reactor, client_id)
+        return
+    
+    client_data['outbox'].extend(frame)
+    client_data['outbox_size'] += frame_size
+    _flush_client(reactor, client_id)
+
+def _flush_client(reactor, client_id):
+    # Runs on the loop thread: writes as much of the outbox as the socket
+    # takes without blocking, the rest waits for EVENT_WRITE. Queued chunks
+    # go out together in one sendmsg call.
+    client_data = reactor.clients.get(client_id)
+    if client_data is None:
+        return
+    
+    outbox = client_data['outbox']
+    client_socket = client_data['socket']
+    try:
+        while outbox:
+            sent = client_socket.sendmsg(list(itertools.islice(outbox, _IOV_MAX)))
+            client_data['outbox_size'] -= sent
+            
+            # Drop the chunks that went out whole and trim a partly sent one
+            while sent:
+                chunk = outbox[0]
+                if sent < len(chunk):
+                    outbox[0] = memoryview(chunk)[sent:]
                     break
-                else:
-                    logger.logger.debug(f"Client {client_id} socket timeout, but recent activity detected, continuing...")
-                    client_socket.settimeout(120)  # Shorter timeout to check more frequently
-                    continue
-                    
-            except ConnectionResetError:
-                logger.logger.warning(f"Client {client_id} connection reset")
+                sent -= len(chunk)
+                outbox.popleft()
+    except (BlockingIOError, InterruptedError):
+        pass
+    except OSError as e:
+        logger.logger.warning("Client %s connection error while sending: %s", client_id, e)
+        _close_client(reactor, client_id)
+        return
+    
+    if client_data['closing'] and not outbox:
+        _close_client(reactor, client_id)
+        return
+    
+    _update_interest(reactor, client_data)
+
+def _send(client_data, message):
+    # Called from pool threads. The frame is built here and handed to the
+    # client's loop, which owns the socket; neither a slow client nor a
+    # concurrent event can make the caller wait.
+    if not isinstance(message, bytes):
+        message = protocol.dumps(message)
+    
+    reactor = client_data['reactor']
+    reactor.call_soon(_queue_frame, reactor, client_data['id'], utils.frame_message(message))
+
+def _handle_client(reactor, client_data):
+    # Runs on a pool thread once the loop has buffered at least one complete
+    # message. Answers every complete message in the buffer, then hands the
+    # client back to its loop.
+    client_socket = client_data['socket']
+    client_id = client_data['id']
+    keep_open = False
+    
+    try:
+        while _running:
+            data = utils.read_available_message(client_data['read_state'])
+            if data is None:
+                keep_open = True
                 break
-            except Exception as e:
-                logger.logger.error(f"Error handling client {client_id}: {e}")
-                logger.logger.debug(f"Traceback: {traceback.format_exc()}")
-                try:
-                    error_response = protocol.create_error_response(f"Server error: {str(e)}")
-                    utils.send_json_message(client_socket, error_response)
-                except Exception as e2:
-                    logger.logger.error(f"Failed to send error response to client {client_id}: {e2}")
+            
+            if not _handle_request(client_socket, client_id, client_data, data):
                 break
+    except ValueError as e:
+        logger.logger.warning("Bad message from client %s, closing connection: %s", client_id, e)
     except Exception as e:
-        logger.logger.error(f"Client {client_id} handler exception: {e}")
-        logger.logger.debug(f"Traceback: {traceback.format_exc()}")
+        logger.logger.error("Error handling client %s: %s", client_id, e)
+        if logger.logger.isEnabledFor(logging.DEBUG):
+            logger.logger.debug("Traceback: %s", traceback.format_exc())
     finally:
-        try:
-            client_socket.close()
-        except:
-            pass
+        reactor.call_soon(_finish_client, reactor, client_id, keep_open)
+
+def _finish_client(reactor, client_id, keep_open):
+    # Runs on the loop thread after a pool thread is done with the client
+    client_data = reactor.clients.get(client_id)
+    if client_data is None:
+        return
+    
+    client_data['busy'] = False
+    if keep_open and _running:
+        _update_interest(reactor, client_data)
+    elif client_data['outbox']:
+        # Whatever was queued, such as an error response, still goes out
+        # before the connection is closed
+        client_data['closing'] = True
+        _update_interest(reactor, client_data)
+    else:
+        _close_client(reactor, client_id)
+
+def _handle_request(client_socket, client_id, client_data, data):
+    # Answers one request, returns False if the connection should be closed
+    try:
+        logger.logger.debug("Received data of length %s from client %s", len(data), client_id)
+        
+        current_time = time.monotonic()
+        client_data['last_activity'] = current_time
         
-        if client_id in _clients:
-            del _clients[client_id]
+        request = protocol.parse_request(data)
+        if not request:
+            logger.logger.warning("Invalid request format from client %s", client_id)
+            _send(client_data, protocol.create_invalid_request_response())
+            return True
         
-        logger.logger.info(f"Client {client_id} connection closed")
+        command = request.get("command", "unknown")
+        request_id = request.get("id", "unknown")
+        
+        # Handle keepalive pings specially
+        if command == "ping":
+            params = request.get("params", {})
+            if params.get("keepalive"):
+                logger.logger.debug("Handling keepalive ping from client %s", client_id)
+                client_data['last_keepalive'] = current_time
+                
+                # Send immediate pong response, pre-serialized
+                keepalive_response = protocol.create_keepalive_response(
+                    request_id,
+                    params.get("timestamp", "none")
+                )
+                _send(client_data, keepalive_response)
+                return True
+        
+        logger.logger.debug("Handling request from client %s - Command: %s, ID: %s", client_id, command, request_id)
+        
+        response = handlers.process_request(request, _config)
+        
+        logger.logger.debug("Sending response for %s, ID: %s to client %s", command, request_id, client_id)
+        _send(client_data, response)
+        logger.logger.debug("Request handled - Command: %s, ID: %s, Client: %s", command, request_id, client_id)
+        
+        # A long request counts as activity, the idle clock starts again
+        # once the response is out
+        client_data['last_activity'] = time.monotonic()
+        return True
+    except ConnectionResetError:
+        logger.logger.warning("Client %s connection reset", client_id)
+        return False
+    except Exception as e:
+        logger.logger.error("Error handling client %s: %s", client_id, e)
+        if logger.logger.isEnabledFor(logging.DEBUG):
+            logger.logger.debug("Traceback: %s", traceback.format_exc())
+        
+        # Socket-level failures mean the peer can't be written to any more,
+        # so only report errors that left the connection usable
+        if _running and not isinstance(e, OSError) and client_socket.fileno() != -1:
+            try:
+                error_response = protocol.create_error_response(f"Server error: {str(e)}")
+                _send(client_data, error_response)
+            except Exception as e2:
+                logger.logger.error("Failed to send error response to client %s: %s", client_id, e2)
+        return False
 
 def handle_event(event_type, event_data):
-    global _clients
-    
-    logger.logger.info(f"Received event: {event_type}")
+    logger.logger.debug("Received event: %s", event_type)
     
-    event_message = protocol.create_event_message(event_type, event_data)
+    # Serialized and framed once here, every client is sent the same bytes
+    event_frame = utils.frame_message(
+        protocol.dumps(protocol.create_event_message(event_type, event_data))
+    )
     
-    for client_id, client_data in list(_clients.items()):
-        try:
-            if client_data['connected']:
-                logger.logger.debug(f"Sending event {event_type} to client {client_id}")
-                utils.send_json_message(client_data['socket'], event_message)
-            else:
-                logger.logger.debug(f"Skipping disconnected client {client_id}")
-        except Exception as e:
-            logger.logger.error(f"Error sending event to client {client_id}: {e}")
-            client_data['connected'] = False
\ No newline at end of file
+    # Each loop queues the frame for its own clients and returns, the
+    # caller never waits on a client. A loop handles its inbox in order, so
+    # an event still reaches a client ahead of the response to the request
+    # that raised it.
+    for reactor in list(_reactors):
+        if threading.current_thread() is reactor.thread:
+            _send_event(reactor, event_type, event_frame)
+        else:
+            reactor.call_soon(_send_event, reactor, event_type, event_frame)
+
+def _send_event(reactor, event_type, event_frame):
+    # Runs on the loop thread. A client that can't take the frame is closed
+    # by _queue_frame, so the ids are copied first.
+    for client_id in list(reactor.clients):
+        logger.logger.debug("Sending event %s to client %s", event_type, client_id)
+        _queue_frame(reactor, client_id, event_frame)
@@ -1,15 +1,19 @@
 import os
-import json
-import socket
 import struct
-import time
+from collections import deque
+import logger
 
 _config = {}
 
+MAX_MESSAGE_SIZE = 100 * 1024 * 1024
+
+# Big-endian 4 byte length prefix in front of every message, compiled once
+_HEADER = struct.Struct('!I')
+
 def init(cfg):
     global _config
     _config.update(cfg)
-    print("UDS utils module initialized")
+    logger.logger.debug("UDS utils module initialized")
 
 def ensure_socket_dir_exists(socket_path):
     socket_dir = os.path.dirname(socket_path)
@@ -19,149 +23,117 @@ def cleanup_socket(socket_path):
     if os.path.exists(socket_path):
         os.unlink(socket_path)
 
-def read_json_message(conn):
-    try:
-        original_timeout = conn.gettimeout()
-        conn.settimeout(120.0)  # 2 minute timeout for reading
-        
-        start_time = time.time()
-        header = b''
-        while len(header) < 4:
-            try:
-                chunk = conn.recv(4 - len(header))
-                if not chunk:
-                    print("UDS Utils: Connection closed while reading header")
-                    return None
-                header += chunk
-            except socket.timeout:
-                elapsed = time.time() - start_time
-                print(f"UDS Utils: Timeout reading header after {elapsed:.2f} seconds")
-                return None
-            except ConnectionResetError:
-                print("UDS Utils: Connection reset by peer")
-                return None
-        
-        message_length = struct.unpack('!I', header)[0]
-        print(f"UDS Utils: Message length: {message_length} bytes")
-        
-        if message_length > 100 * 1024 * 1024:
-            print(f"UDS Utils: Message length too large: {message_length}")
-            return None
-        
-        if message_length == 0:
-            print("UDS Utils: Zero-length message received")
+class BufferPool:
+    # Reusable receive buffers in a few size buckets. A request is rounded up
+    # to the smallest bucket that fits, so the returned bytearray can be
+    # longer than asked for; sizes above the largest bucket are allocated
+    # and dropped as usual. deque append/pop are atomic, no lock is needed.
+    def __init__(self, buckets, max_per_bucket=32):
+        self.buckets = tuple(sorted(buckets))
+        self.max_per_bucket = max_per_bucket
+        self._free = {size: deque() for size in self.buckets}
+    
+    def acquire(self, size):
+        for bucket in self.buckets:
+            if size <= bucket:
+                try:
+                    return self._free[bucket].pop()
+                except IndexError:
+                    return bytearray(bucket)
+        return bytearray(size)
+    
+    def release(self, buffer):
+        free = self._free.get(len(buffer))
+        if free is not None and len(free) < self.max_per_bucket:
+            free.append(buffer)
+
+# Largest single read on the server path. Client sockets ask for 4 MB
+# kernel buffers, so a large request can be taken in a few reads.
+RECEIVE_SIZE = 256 * 1024
+
+# Connection scratch buffers are the only pooled buffers, all of them
+# RECEIVE_SIZE
+_buffers = BufferPool((RECEIVE_SIZE,))
+
+def new_read_state():
+    # Per-connection state for the non-blocking reader below: bytes received
+    # so far, the length of the message being assembled once its header
+    # has arrived, and a scratch buffer the socket is read into.
+    # The scratch buffer is pooled, hand the state to release_read_state
+    # when the connection closes.
+    scratch = _buffers.acquire(RECEIVE_SIZE)
+    return {
+        'buffer': bytearray(),
+        'expected_len': None,
+        'scratch': scratch,
+        'scratch_view': memoryview(scratch)
+    }
+
+def release_read_state(state):
+    # Must not run while receive_available may still be called with state
+    scratch = state.pop('scratch', None)
+    state.pop('scratch_view', None)
+    if scratch is not None:
+        _buffers.release(scratch)
+
+def receive_available(conn, state):
+    # One recv of whatever the socket has, for use after select() reported
+    # it readable. Returns the number of bytes read, 0 once the peer closed.
+    # recv_into the connection's scratch buffer avoids allocating a new
+    # bytes object for every read.
+    received = conn.recv_into(state['scratch'])
+    if received:
+        state['buffer'] += state['scratch_view'][:received]
+    return received
+
+def _expected_length(state):
+    expected_len = state['expected_len']
+    if expected_len is None:
+        buffer = state['buffer']
+        if len(buffer) < _HEADER.size:
             return None
         
-        message = b''
-        read_start = time.time()
-        bytes_read = 0
-        
-        while len(message) < message_length:
-            try:
-                chunk_size = min(8192, message_length - len(message))
-                chunk = conn.recv(chunk_size)
-                if not chunk:
-                    elapsed = time.time() - start_time
-                    print(f"UDS Utils: Connection closed while reading message body after {elapsed:.2f} seconds")
-                    return None
-                message += chunk
-                bytes_read += len(chunk)
-                
-                # Reset timeout on progress to handle large messages
-                if bytes_read % (64 * 1024) == 0:  # Every 64KB
-                    conn.settimeout(120.0)
-                
-                if message_length > 1024*1024 and len(message) % (1024*1024) < 8192:
-                    print(f"UDS Utils: Read {len(message)/1024/1024:.1f}MB of {message_length/1024/1024:.1f}MB")
-            except socket.timeout:
-                elapsed = time.time() - start_time
-                print(f"UDS Utils: Timeout reading message body after {elapsed:.2f} seconds, read {len(message)} of {message_length} bytes")
-                return None
-            except ConnectionResetError:
-                print("UDS Utils: Connection reset by peer while reading body")
-                return None
-        
-        read_time = time.time() - read_start
-        print(f"UDS Utils: Read complete message of {len(message)} bytes in {read_time:.2f} seconds")
+        expected_len = _HEADER.unpack_from(buffer)[0]
+        if expected_len == 0 or expected_len > MAX_MESSAGE_SIZE:
+            raise ValueError(f"Invalid message length: {expected_len}")
         
-        # Restore original timeout
-        if original_timeout is not None:
-            conn.settimeout(original_timeout)
-        
-        try:
-            decoded = message.decode('utf-8')
-            json.loads(decoded)  # Validate JSON
-            return decoded
-        except json.JSONDecodeError as e:
-            print(f"UDS Utils: Invalid JSON received: {e}")
-            # Log first 500 chars for debugging
-            preview = decoded[:500] if len(decoded) > 500 else decoded
-            print(f"UDS Utils: JSON preview: {repr(preview)}")
-            return None
-        except UnicodeDecodeError as e:
-            print(f"UDS Utils: Unicode decode error: {e}")
-            return None
-            
-    except Exception as e:
-        print(f"UDS Utils: Error reading from socket: {e}")
-        import traceback
-        print(f"UDS Utils: {traceback.format_exc()}")
-        return None
+        state['expected_len'] = expected_len
+    
+    return expected_len
 
-def send_json_message(conn, data):
+def message_ready(state):
+    # True once the buffer holds a complete message, or a header that
+    # read_available_message will reject
     try:
-        original_timeout = conn.gettimeout()
-        conn.settimeout(120.0)  # 2 minute timeout for sending
-        
-        start_time = time.time()
-        json_data = json.dumps(data)
-        message = json_data.encode('utf-8')
-        
-        length_prefix = struct.pack('!I', len(message))
-        
-        print(f"UDS Utils: Sending message of {len(message)} bytes")
-        
-        try:
-            conn.sendall(length_prefix)
-        except (ConnectionResetError, BrokenPipeError) as e:
-            print(f"UDS Utils: Connection error while sending header: {e}")
-            return False
-        except socket.timeout as e:
-            print(f"UDS Utils: Timeout while sending header: {e}")
-            return False
-        
-        chunk_size = 8192
-        sent = 0
-        while sent < len(message):
-            try:
-                chunk = message[sent:sent+chunk_size]
-                conn.sendall(chunk)
-                sent += len(chunk)
-                
-                # Reset timeout on progress for large messages
-                if sent % (64 * 1024) == 0:  # Every 64KB
-                    conn.settimeout(120.0)
-                
-                if len(message) > 1024*1024 and sent % (1024*1024) < chunk_size:
-                    print(f"UDS Utils: Sent {sent/1024/1024:.1f}MB of {len(message)/1024/1024:.1f}MB")
-            except (ConnectionResetError, BrokenPipeError) as e:
-                print(f"UDS Utils: Connection error while sending body: {e}")
-                return False
-            except socket.timeout as e:
-                elapsed = time.time() - start_time
-                print(f"UDS Utils: Timeout while sending body after {elapsed:.2f}s, sent {sent} of {len(message)} bytes: {e}")
-                return False
-        
-        elapsed = time.time() - start_time
-        print(f"UDS Utils: Message sent successfully in {elapsed:.2f} seconds")
-        
-        # Restore original timeout
-        if original_timeout is not None:
-            conn.settimeout(original_timeout)
-        
+        expected_len = _expected_length(state)
+    except ValueError:
         return True
-    except Exception as e:
-        print(f"UDS Utils: Error sending to socket: {e}")
-        import traceback
-        print(f"UDS Utils: {traceback.format_exc()}")
-        return False
\ No newline at end of file
+    
+    return expected_len is not None and len(state['buffer']) >= _HEADER.size + expected_len
+
+def read_available_message(state):
+    # Takes the next complete message off the buffer and returns its
+    # payload, or None if more data is needed. Never touches the socket.
+    expected_len = _expected_length(state)
+    if expected_len is None:
+        return None
+    
+    buffer = state['buffer']
+    end = _HEADER.size + expected_len
+    if len(buffer) < end:
+        return None
+    
+    # Copied out through a memoryview, slicing the bytearray first would
+    # copy the payload twice
+    with memoryview(buffer) as view:
+        payload = bytes(view[_HEADER.size:end])
+    del buffer[:end]
+    state['expected_len'] = None
+    
+    return payload
+
+def frame_message(message):
+    # (header, payload) pair, ready to be queued on a connection's outbox.
+    # They are kept apart so the payload is sent without being copied
+    # behind its header.
+    return _HEADER.pack(len(message)), message
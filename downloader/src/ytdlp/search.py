@@ -1,4 +1,3 @@
-import yt_dlp
 import time
 import traceback
 from ytdlp import utils
@@ -13,9 +12,9 @@ def find(query, platform='youtube', limit=5, include_live=False):
     platform = platform.lower()
     
     # Set longer timeout for YouTube Music searches
-    timeout = 60  # Default timeout
+    ydl_name = 'search'
     if platform in ['music.youtube.com', 'ytmusic', 'youtube music', 'https://music.youtube.com']:
-        timeout = 120  # Extended timeout for YouTube Music
+        ydl_name = 'search_slow'
     
     # Handle different platform inputs
     if platform in ['youtube', 'youtu.be', 'youtube.com', 'https://youtube.com', 'https://youtu.be']:
@@ -24,6 +23,7 @@ def find(query, platform='youtube', limit=5, include_live=False):
     elif platform in ['soundcloud', 'soundcloud.com', 'https://soundcloud.com']:
         search_url = f'scsearch{limit*2}:{query}'
         allowed_platform = 'https://soundcloud.com'
+        ydl_name = 'search_full'
     elif platform in ['music.youtube.com', 'ytmusic', 'youtube music', 'https://music.youtube.com']:
         search_url = f'ytsearch{limit*2}:{query} site:music.youtube.com'
         allowed_platform = 'https://music.youtube.com'
@@ -33,23 +33,22 @@ def find(query, platform='youtube', limit=5, include_live=False):
     
     print(f"SEARCH: Using search URL: {search_url}")
     
-    ydl_opts = {
-        'format': 'bestaudio/best',
-        'skip_download': True,
-        'quiet': True,
-        'no_warnings': True,
-        'ignoreerrors': True,
-        'socket_timeout': timeout  # Use dynamic timeout
-    }
-    
     try:
         print("SEARCH: Starting yt-dlp extraction")
         ytdlp_start = time.time()
         
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        with utils.shared_ydl(ydl_name) as ydl:
             print("SEARCH: Calling extract_info...")
             info = ydl.extract_info(search_url, download=False)
             
+            # Flat entries without any duration mean the extractor didn't
+            # list metadata on the results page, fall back to extracting them
+            if ydl_name != 'search_full' and info and info.get('entries') and not any(
+                    entry and entry.get('duration') is not None for entry in info['entries']):
+                print("SEARCH: Flat results have no durations, extracting entries")
+                with utils.shared_ydl('search_full') as full_ydl:
+                    info = full_ydl.extract_info(search_url, download=False)
+            
             ytdlp_elapsed = time.time() - ytdlp_start
             print(f"SEARCH: yt-dlp extraction completed in {ytdlp_elapsed:.2f} seconds")
             
@@ -98,6 +97,9 @@ def find(query, platform='youtube', limit=5, include_live=False):
                 thumbnail = entry.get('thumbnail', '')
                 if isinstance(thumbnail, dict) and 'url' in thumbnail:
                     thumbnail = thumbnail['url']
+                if not thumbnail and entry.get('thumbnails'):
+                    # Flat entries list thumbnails smallest to largest
+                    thumbnail = entry['thumbnails'][-1].get('url', '')
                 
                 # Get direct URL for the video/audio
                 url = entry.get('webpage_url') or entry.get('url', '')
@@ -115,7 +117,7 @@ def find(query, platform='youtube', limit=5, include_live=False):
                     'thumbnail': thumbnail,
                     'platform': allowed_platform,
                     'id': entry.get('id', ''),
-                    'live_status': entry.get('is_live', False)
+                    'live_status': entry.get('is_live') or entry.get('live_status') == 'is_live'
                 })
                 
                 if len(results) >= limit:
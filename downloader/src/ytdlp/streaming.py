@@ -1,5 +1,4 @@
 import os
-import time
 import yt_dlp
 import traceback
 from ytdlp import utils, audio
@@ -17,21 +16,14 @@ def download_playlist_streaming(url, download_path, db, event_callback=None, req
     
     try:
         # First, check if the playlist already exists in the database
-        db_playlist = None
+        db_playlist_id = None
         try:
-            db_playlist = db.get_playlist_by_url(url)
+            db_playlist_id = db.get_playlist_id_by_url(url)
         except Exception as e:
             print(f"Error checking for existing playlist: {e}")
         
         # Get playlist info first to determine what we're working with
-        with yt_dlp.YoutubeDL({
-            'skip_download': True, 
-            'quiet': True, 
-            'noplaylist': False,
-            'extract_flat': True,
-            'socket_timeout': 30,
-            'ignoreerrors': True
-        }) as ydl:
+        with utils.shared_ydl('playlist_flat') as ydl:
             info = ydl.extract_info(url, download=False)
             
             if not info or not info.get('entries'):
@@ -72,9 +64,7 @@ def download_playlist_streaming(url, download_path, db, event_callback=None, req
                 print("The janitor will clean up old songs on its next run.")
             
             # Create or get the playlist in the database
-            db_playlist_id = None
-            if db_playlist:
-                db_playlist_id = db_playlist['id']
+            if db_playlist_id:
                 print(f"Using existing playlist with ID: {db_playlist_id}")
             else:
                 try:
@@ -90,87 +80,31 @@ def download_playlist_streaming(url, download_path, db, event_callback=None, req
             successful_downloads = 0
             results = []
             first_track = None
+            playlist_songs = []
             
-            # Process each entry
-            for i, entry in enumerate(entries):
-                if not entry or not entry.get('id'):
-                    print(f"Skipping unavailable playlist item")
-                    continue
-                
-                video_id = entry.get('id')
-                video_url = f"https://www.youtube.com/watch?v={video_id}"
-                
-                print(f"Processing item {i+1}/{len(entries)}: {entry.get('title', 'Unknown')}")
+            video_urls = [f"https://www.youtube.com/watch?v={entry.get('id')}" for entry in entries]
+            
+            # Items download concurrently, but the results come back in
+            # playlist order, so events still reach the bot in the order the
+            # tracks should be queued
+            downloads = audio.download_many(
+                video_urls,
+                download_path,
+                db,
+                max_duration_seconds=max_duration_seconds,
+                max_size_mb=max_size_mb,
+                allow_live=allow_live
+            )
+            
+            for i, (video_url, result, error) in enumerate(downloads):
+                entry = entries[i]
+                print(f"Processed item {i+1}/{len(entries)}: {entry.get('title', 'Unknown')}")
                 
-                try:
-                    # Download the audio
-                    result = audio.download(
-                        video_url, 
-                        download_path, 
-                        db,
-                        max_duration_seconds=max_duration_seconds,
-                        max_size_mb=max_size_mb,
-                        allow_live=allow_live
-                    )
-                    
-                    if not result:
+                if error is not None or not result:
+                    if error is None:
                         print(f"Failed to download or process playlist item: {video_url}")
-                        results.append({
-                            'title': entry.get('title', 'Unknown'),
-                            'filename': None,
-                            'duration': None,
-                            'file_size': None,
-                            'platform': platform,
-                            'skipped': True,
-                            'error': "Download failed"
-                        })
-                        continue
-                    
-                    # Add to database playlist if we have a playlist ID
-                    if db_playlist_id and 'id' in result:
-                        song_id = result['id']
-                        try:
-                            position_result = db.query(
-                                "SELECT position FROM playlist_songs WHERE playlist_id = ? AND song_id = ?",
-                                (db_playlist_id, song_id)
-                            )
-                            
-                            if not position_result:
-                                db.add_song_to_playlist(db_playlist_id, song_id, i)
-                                print(f"Added song ID {song_id} to playlist ID {db_playlist_id}")
-                            else:
-                                print(f"Song ID {song_id} already in playlist ID {db_playlist_id}")
-                        except Exception as e:
-                            print(f"Error adding song to playlist: {e}")
-                    
-                    successful_downloads += 1
-                    results.append(result)
-                    
-                    if i == 0 and not first_track:
-                        first_track = result
-                    
-                    # Send event for the downloaded track
-                    if event_callback:
-                        try:
-                            event_data = {
-                                'track': result,
-                                'guild_id': guild_id,
-                                'requester': requester,
-                                'position': i,
-                                'playlist': {
-                                    'title': playlist_title,
-                                    'url': url,
-                                    'total_tracks': len(entries)
-                                }
-                            }
-                            event_callback('playlist_item_downloaded', event_data)
-                            print(f"Sent playlist_item_downloaded event for {result.get('title')}")
-                        except Exception as e:
-                            print(f"Error sending event: {e}")
-                            traceback.print_exc()
-                
-                except Exception as e:
-                    print(f"Error processing playlist item {video_url}: {e}")
+                    else:
+                        print(f"Error processing playlist item {video_url}: {error}")
                     results.append({
                         'title': entry.get('title', 'Unknown'),
                         'filename': None,
@@ -178,10 +112,47 @@ def download_playlist_streaming(url, download_path, db, event_callback=None, req
                         'file_size': None,
                         'platform': platform,
                         'skipped': True,
-                        'error': str(e)
+                        'error': error or "Download failed"
                     })
+                    continue
+                
+                if db_playlist_id and 'id' in result:
+                    playlist_songs.append((result['id'], i))
+                
+                successful_downloads += 1
+                results.append(result)
+                
+                if i == 0 and not first_track:
+                    first_track = result
+                
+                # Send event for the downloaded track
+                if event_callback:
+                    try:
+                        event_data = {
+                            'track': result,
+                            'guild_id': guild_id,
+                            'requester': requester,
+                            'position': i,
+                            'playlist': {
+                                'title': playlist_title,
+                                'url': url,
+                                'total_tracks': len(entries)
+                            }
+                        }
+                        event_callback('playlist_item_downloaded', event_data)
+                        print(f"Sent playlist_item_downloaded event for {result.get('title')}")
+                    except Exception as e:
+                        print(f"Error sending event: {e}")
+                        traceback.print_exc()
             
-            time.sleep(0.5)  # Give a moment for events to be processed
+            # Every link is written in one transaction, instead of a lookup
+            # and a commit per item
+            if playlist_songs:
+                try:
+                    db.add_songs_to_playlist(db_playlist_id, playlist_songs)
+                    print(f"Added {len(playlist_songs)} songs to playlist ID {db_playlist_id}")
+                except Exception as e:
+                    print(f"Error adding songs to playlist: {e}")
             
             # Return the final result
             return {
@@ -194,23 +165,13 @@ def download_playlist_streaming(url, download_path, db, event_callback=None, req
             }
             
     except yt_dlp.utils.DownloadError as e:
-        error_msg = str(e).lower()
+        error_msg = utils.describe_download_error(e, utils.PLAYLIST_ERRORS)
+        if error_msg:
+            print(f"Download error: {error_msg}")
+            raise yt_dlp.utils.DownloadError(error_msg)
         
-        if "private" in error_msg:
-            print(f"Download error: This playlist is private")
-            raise yt_dlp.utils.DownloadError("This playlist is private")
-        elif any(term in error_msg for term in ["premium", "paywall", "subscribe", "login", "member", "paid"]):
-            print(f"Download error: This playlist requires a premium account or login")
-            raise yt_dlp.utils.DownloadError("This playlist requires a premium account or login")
-        elif "unavailable" in error_msg:
-            print(f"Download error: This playlist is unavailable")
-            raise yt_dlp.utils.DownloadError("This playlist is unavailable")
-        elif "not exist" in error_msg or "no longer" in error_msg or "not found" in error_msg:
-            print(f"Download error: This playlist does not exist or could not be found")
-            raise yt_dlp.utils.DownloadError("This playlist does not exist or could not be found")
-        else:
-            print(f"Download error: {e}")
-            raise
+        print(f"Download error: {e}")
+        raise
     except Exception as e:
         print(f"Error downloading playlist: {e}")
         traceback.print_exc()
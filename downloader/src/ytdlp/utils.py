@@ -1,12 +1,93 @@
 import os
 import re
+import threading
+from contextlib import contextmanager
+import yt_dlp
 
 config = {}
 
+# Option sets for the metadata-only extractions. These don't change from
+# call to call, so their YoutubeDL instances are kept and reused: building
+# one loads every extractor, and a reused instance keeps its HTTP
+# connections alive instead of paying a new TLS handshake per request.
+YDL_OPTIONS = {
+    'playlist_flat': {
+        'skip_download': True,
+        'quiet': True,
+        'noplaylist': False,
+        'extract_flat': True,
+        'socket_timeout': 30,
+        'ignoreerrors': True
+    },
+    'playlist_info': {
+        'skip_download': True,
+        'quiet': True,
+        'noplaylist': False,
+        'extract_flat': True,
+        'socket_timeout': 60,
+        'ignoreerrors': True
+    },
+    # YouTube searches only read what the results page already lists
+    # (title, duration, channel, thumbnails), so the videos aren't extracted
+    'search': {
+        'skip_download': True,
+        'quiet': True,
+        'no_warnings': True,
+        'ignoreerrors': True,
+        'extract_flat': 'in_playlist',
+        'socket_timeout': 60
+    },
+    'search_slow': {
+        'skip_download': True,
+        'quiet': True,
+        'no_warnings': True,
+        'ignoreerrors': True,
+        'extract_flat': 'in_playlist',
+        'socket_timeout': 120
+    },
+    # Full extraction of every result, for extractors whose flat search
+    # entries carry no metadata (SoundCloud)
+    'search_full': {
+        'format': 'bestaudio/best',
+        'skip_download': True,
+        'quiet': True,
+        'no_warnings': True,
+        'ignoreerrors': True,
+        'socket_timeout': 60
+    }
+}
+
+# name -> idle YoutubeDL instances. An instance is checked out by one
+# caller at a time, YoutubeDL is not safe to share between threads.
+_idle_ydl = {name: [] for name in YDL_OPTIONS}
+_idle_ydl_lock = threading.Lock()
+
 def init(cfg):
     global config
     config.update(cfg)
 
+@contextmanager
+def shared_ydl(name):
+    with _idle_ydl_lock:
+        idle = _idle_ydl[name]
+        ydl = idle.pop() if idle else None
+    
+    if ydl is None:
+        ydl = yt_dlp.YoutubeDL(dict(YDL_OPTIONS[name]))
+    
+    try:
+        yield ydl
+    finally:
+        with _idle_ydl_lock:
+            _idle_ydl[name].append(ydl)
+
+def warm_ydl():
+    # Builds one instance per option set so the first request doesn't pay
+    # for loading the extractors
+    for name in YDL_OPTIONS:
+        with shared_ydl(name):
+            pass
+
 def get_platform(url):
     url = url.lower()
     
@@ -80,10 +161,10 @@ def match_filter_func(info, max_duration_seconds=None, max_size_mb=None, allow_l
     if not allow_live and info.get('duration') is None:
         return "Video is a live stream (duration is None)"
         
-    if max_duration_seconds and info.get('duration', 0) > max_duration_seconds:
+    if max_duration_seconds is not None and info.get('duration', 0) > max_duration_seconds:
         return f"The video is too long ({info['duration']} seconds > {max_duration_seconds} seconds)"
     
-    if max_size_mb:
+    if max_size_mb is not None:
         max_bytes = max_size_mb * 1024 * 1024
         if info.get('filesize_approx', 0) > max_bytes:
             return f"The file is too large ({info['filesize_approx'] / (1024*1024):.1f}MB > {max_size_mb}MB)"
@@ -95,6 +176,38 @@ def match_filter_func(info, max_duration_seconds=None, max_size_mb=None, allow_l
     
     return None
 
+# yt-dlp error text -> message shown to the user, checked in order. Compiled
+# once so classifying a failure is a few regex searches.
+def _error_patterns(*entries):
+    return [(re.compile(pattern, re.DOTALL), message) for pattern, message in entries]
+
+VIDEO_ERRORS = _error_patterns(
+    (r"private", "This video is private"),
+    (r"premium|paywall|subscribe|login|member|paid", "This content requires a premium account or login"),
+    (r"removed|deleted|taken down", "This video has been removed or deleted"),
+    (r"unavailable", "This video is unavailable"),
+    (r"copyright", "This video is blocked due to copyright issues"),
+    (r"^(?=.*age)(?=.*(?:restrict|verify))", "This video is age-restricted"),
+    (r"^(?=.*geo)(?=.*block)|country", "This video is not available in your country"),
+    (r"not exist|no longer|not found", "This video does not exist or could not be found")
+)
+
+PLAYLIST_ERRORS = _error_patterns(
+    (r"private", "This playlist is private"),
+    (r"premium|paywall|subscribe|login|member|paid", "This playlist requires a premium account or login"),
+    (r"unavailable", "This playlist is unavailable"),
+    (r"not exist|no longer|not found", "This playlist does not exist or could not be found")
+)
+
+def describe_download_error(error, patterns=VIDEO_ERRORS):
+    # Returns the user-facing message for a DownloadError, or None if it
+    # matches none of the known causes
+    error_msg = str(error).lower()
+    for pattern, message in patterns:
+        if pattern.search(error_msg):
+            return message
+    return None
+
 def progress_hook(d):
     if d['status'] == 'downloading':
         percent = d.get('_percent_str', 'N/A')
@@ -1,7 +1,9 @@
-from ytdlp import audio, playlist, search as search_module, utils, streaming
+from ytdlp import audio, search as search_module, utils, streaming
 import os
 import time
+import threading
 import traceback
+import uuid
 from database import Database
 import logger
 import yt_dlp
@@ -20,12 +22,24 @@ def initialize(cfg):
         db_path = os.path.join(os.path.dirname(config["download_path"]), "musicbot.db")
         logger.logger.warning(f"db_path not provided in config, using default: {db_path}")
     
-    if not os.path.exists(db_path):
+    db_exists = os.path.exists(db_path)
+    if not db_exists:
         logger.logger.warning(f"Database file does not exist at {db_path}")
         logger.logger.warning("Please run the database initializer before starting the downloader")
     
     db = Database(db_path)
+    if db_exists:
+        db.ensure_indexes()
     logger.logger.info(f"Connected to database at: {db_path}")
+    
+    # Build the shared YoutubeDL instances in the background so startup
+    # isn't held up by loading the extractors
+    threading.Thread(target=utils.warm_ydl, daemon=True).start()
+
+def shutdown():
+    # Writes out any buffered play counts before the process exits
+    if db:
+        db.close()
 
 def register_event_callback(callback):
     """Register a callback function to be called when events occur"""
@@ -56,32 +70,6 @@ def download_audio(url, max_duration_seconds=None, max_size_mb=None, allow_live=
         logger.logger.warning(f"Allowed origins: {config['allowed_origins']}")
         return {"status": "error", "message": f"Platform '{platform}' is not allowed"}
     
-    try:
-        logger.logger.info("Checking database for existing song")
-        song = db.get_song_by_url(url)
-        if song and os.path.exists(song['file_path']):
-            logger.logger.info(f"Song already exists in database and file exists: {song['title']}")
-            artist = song['artist'] if 'artist' in song else ''
-            thumbnail_url = song['thumbnail_url'] if 'thumbnail_url' in song else ''
-            is_stream = bool(song['is_stream']) if 'is_stream' in song else False
-            
-            return {
-                "status": "success",
-                "title": song['title'],
-                "filename": song['file_path'],
-                "duration": song['duration'],
-                "file_size": song['file_size'],
-                "platform": song['platform'],
-                "artist": artist,
-                "thumbnail_url": thumbnail_url,
-                "is_stream": is_stream,
-                "id": song['id'],
-                "skipped": True
-            }
-    except Exception as e:
-        logger.logger.error(f"Error checking database: {e}")
-        logger.logger.debug(f"Traceback: {traceback.format_exc()}")
-    
     try:
         logger.logger.info(f"Starting audio download with params: max_duration={max_duration_seconds}, max_size={max_size_mb}")
         result = audio.download(
@@ -104,34 +92,10 @@ def download_audio(url, max_duration_seconds=None, max_size_mb=None, allow_live=
             logger.logger.error(f"Download failed after {elapsed:.2f} seconds")
             return {"status": "error", "message": "Download failed"}
         
-        logger.logger.info(f"Download succeeded in {elapsed:.2f} seconds, checking database for song record")
-        
-        try:
-            song = db.get_song_by_url(url)
-            if song:
-                logger.logger.info(f"Song record found in database: {song['title']}")
-                artist = song['artist'] if 'artist' in song else ''
-                thumbnail_url = song['thumbnail_url'] if 'thumbnail_url' in song else ''
-                is_stream = bool(song['is_stream']) if 'is_stream' in song else False
-                
-                return {
-                    "status": "success",
-                    "title": song['title'],
-                    "filename": song['file_path'],
-                    "duration": song['duration'],
-                    "file_size": song['file_size'],
-                    "platform": song['platform'],
-                    "artist": artist,
-                    "thumbnail_url": thumbnail_url,
-                    "is_stream": is_stream,
-                    "id": song['id'],
-                    "skipped": False
-                }
-        except Exception as e:
-            logger.logger.error(f"Error getting song from database after download: {e}")
-            logger.logger.debug(f"Traceback: {traceback.format_exc()}")
-        
-        logger.logger.info(f"Returning download result directly: {result.get('title', 'Unknown')}")
+        if result.get('skipped'):
+            logger.logger.info(f"Song already exists in database and file exists: {result.get('title', 'Unknown')}")
+        else:
+            logger.logger.info(f"Download succeeded in {elapsed:.2f} seconds: {result.get('title', 'Unknown')}")
         
         # Add a status field if not present
         if isinstance(result, dict) and 'status' not in result:
@@ -224,14 +188,7 @@ def get_playlist_info(url, max_items=None):
         return {"status": "error", "message": f"Platform '{platform}' is not allowed"}
     
     try:
-        with yt_dlp.YoutubeDL({
-            'skip_download': True, 
-            'quiet': True, 
-            'noplaylist': False,
-            'extract_flat': True,
-            'socket_timeout': 60,  # Increased timeout for playlist info
-            'ignoreerrors': True
-        }) as ydl:
+        with utils.shared_ydl('playlist_info') as ydl:
             info = ydl.extract_info(url, download=False)
             
             if not info:
@@ -361,13 +318,13 @@ def download_playlist_item(url, index, max_duration_seconds=None, max_size_mb=No
             
             # Add to playlist in database if needed
             try:
-                db_playlist = db.get_playlist_by_url(url)
+                db_playlist_id = db.get_playlist_id_by_url(url)
                 
-                if db_playlist and 'id' in result:
+                if db_playlist_id and 'id' in result:
                     song_id = result['id']
                     try:
-                        db.add_song_to_playlist(db_playlist['id'], song_id, index)
-                        logger.logger.info(f"Added song ID {song_id} to playlist ID {db_playlist['id']}")
+                        db.add_song_to_playlist(db_playlist_id, song_id, index)
+                        logger.logger.info(f"Added song ID {song_id} to playlist ID {db_playlist_id}")
                     except Exception as e:
                         logger.logger.error(f"Error adding song to playlist: {e}")
             except Exception as e:
@@ -388,36 +345,15 @@ def download_playlist_item(url, index, max_duration_seconds=None, max_size_mb=No
             }
     except yt_dlp.utils.DownloadError as e:
         elapsed = time.time() - start_time
-        error_msg = str(e).lower()
         
         # Provide detailed error message based on the type of error
-        if "private" in error_msg:
-            logger.logger.error(f"Download error: This video is private")
-            return {"status": "error", "message": "This video is private"}
-        elif any(term in error_msg for term in ["premium", "paywall", "subscribe", "login", "member", "paid"]):
-            logger.logger.error(f"Download error: This content requires a premium account or login")
-            return {"status": "error", "message": "This content requires a premium account or login"}
-        elif any(term in error_msg for term in ["removed", "deleted", "taken down"]):
-            logger.logger.error(f"Download error: This video has been removed or deleted")
-            return {"status": "error", "message": "This video has been removed or deleted"}
-        elif "unavailable" in error_msg:
-            logger.logger.error(f"Download error: This video is unavailable")
-            return {"status": "error", "message": "This video is unavailable"}
-        elif "copyright" in error_msg:
-            logger.logger.error(f"Download error: This video is blocked due to copyright issues")
-            return {"status": "error", "message": "This video is blocked due to copyright issues"}
-        elif "age" in error_msg and ("restrict" in error_msg or "verify" in error_msg):
-            logger.logger.error(f"Download error: This video is age-restricted")
-            return {"status": "error", "message": "This video is age-restricted"}
-        elif ("geo" in error_msg and "block" in error_msg) or "country" in error_msg:
-            logger.logger.error(f"Download error: This video is not available in your country")
-            return {"status": "error", "message": "This video is not available in your country"}
-        elif "not exist" in error_msg or "no longer" in error_msg or "not found" in error_msg:
-            logger.logger.error(f"Download error: This video does not exist or could not be found")
-            return {"status": "error", "message": "This video does not exist or could not be found"}
-        else:
-            logger.logger.error(f"Download error after {elapsed:.2f} seconds: {e}")
-            return {"status": "error", "message": str(e)}
+        error_msg = utils.describe_download_error(e)
+        if error_msg:
+            logger.logger.error(f"Download error: {error_msg}")
+            return {"status": "error", "message": error_msg}
+        
+        logger.logger.error(f"Download error after {elapsed:.2f} seconds: {e}")
+        return {"status": "error", "message": str(e)}
     except Exception as e:
         elapsed = time.time() - start_time
         logger.logger.error(f"Error in download_playlist_item after {elapsed:.2f} seconds: {e}")
@@ -478,11 +414,9 @@ def start_playlist_download(url, max_items=None, max_duration_seconds=None, max_
     logger.logger.info(f"Starting async playlist download for URL: {url}, max_items: {max_items}")
     
     # Generate a unique playlist ID
-    import uuid
     playlist_id = str(uuid.uuid4())
     
     # Start the download in a background thread
-    import threading
     thread = threading.Thread(
         target=_background_playlist_download,
         args=(playlist_id, url, max_items, max_duration_seconds, max_size_mb, allow_live, requester, guild_id)